@@ -3,10 +3,9 @@ import tkinter
 from typing import Any, Optional
 from os.path import basename, dirname
 
-from massacre.mission_aggregation_helper import get_missions_for_all_cmdrs
-
 from massacre.ui import ui
 from massacre.logger_factory import logger
+from massacre import journal_events
 from massacre.massacre_settings import configuration, build_settings_ui, push_new_changes
 from massacre.version_check import build_worker
 
@@ -39,51 +38,21 @@ def plugin_start3(_: str) -> str:
     else:
         logger.info("Skipping Update Check. Disabled in Settings")
 
-    # Building Mission Index
-    import datetime as dt
-    mission_uuid_to_mission_lookup = get_missions_for_all_cmdrs(dt.date.today() - dt.timedelta(weeks=2))
-    logger.info(f"Found Missions for {len(mission_uuid_to_mission_lookup)} CMDRs (completed, finished, failed, etc)")
-    from massacre.mission_repository import set_new_repo
-    set_new_repo(mission_uuid_to_mission_lookup)
+    journal_events.start_mission_index(ui.notify_mission_index_ready)
+    from massacre.mission_repository import set_store_budget
+    set_store_budget(configuration.mission_store_budget)
+    configuration.config_changed_listeners.append(lambda config: set_store_budget(config.mission_store_budget))
 
     logger.info("Awaiting CMDR Name to start building Mission Index")
     return basename(dirname(__file__))
 
 
-def journal_entry(cmdr: str, _is_beta: bool, _system: str,
+def journal_entry(cmdr: str, _is_beta: bool, system: Optional[str],
                   _station: str, entry: dict[str, Any], _state: dict[str, Any]):
-    if entry["event"] == "Missions": # 获取任务id?
-        # Fetch the currently active missions and pass them to the Mission Registry
-        active_mission_uuids = map(lambda x: int(x["MissionID"]), entry["Active"])
-        from massacre.mission_repository import set_active_uuids
-        set_active_uuids(list(active_mission_uuids), cmdr)
-
-    elif entry["event"] == "MissionAccepted":
-        # A new mission has been accepted. The Mission Repository should be notified about this
-        from massacre.mission_repository import mission_repository
-        if mission_repository is not None:
-            mission_repository.notify_about_new_mission_accepted(entry, cmdr)
-
-    elif entry["event"] == "MissionRedirected":
-        #增加任务目标完成的处理，此处是处理“事件”
-        mission_uuid = entry["MissionID"]
-        from massacre.mission_repository import mission_repository
-        if mission_repository is not None:
-            mission_repository.notify_complete_mission_gone(mission_uuid)
-
-    elif entry["event"] in ["MissionAbandoned", "MissionCompleted"]:
-        # Mission has been completed or failed -> It is no longer active
-        mission_uuid = entry["MissionID"]
-        from massacre.mission_repository import mission_repository
-        if mission_repository is not None:
-            mission_repository.notify_about_mission_gone(mission_uuid)
+    journal_events.handle_journal_event(cmdr, entry, system)
 
     # Pass through the Event to any Integration that needs it
-    for integration in integrations.get_all_active():
-        try:
-            integration.notify_new_event(entry)
-        except Exception as e:
-            logger.exception(e)
+    integrations.notify_about_event(entry)
 
 
 def plugin_prefs(parent: Any, _cmdr: str, _is_beta: bool):
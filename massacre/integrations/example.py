@@ -3,8 +3,9 @@ This is a basic example on how to create an Integration to Interact with EDMC-Ma
 """
 
 import threading
-from massacre import logger_factory, massacre_settings, ui
+from massacre import logger_factory, massacre_settings
 from massacre.integrations.integration import Integration
+from massacre.massacre_mission_state import MassacreMissionSnapshot, massacre_snapshot_listeners
 import queue
 import tkinter as tk
 import myNotebook as nb
@@ -53,15 +54,17 @@ class ExampleIntegration(Integration):
         self.is_running = False
         self.__http_thread = None
         self.__config = ExampleIntegrationConfig()
-        self.__message_queue = queue.Queue()
-        self.__settings_temp = {}
+        self.__message_queue: queue.Queue[MassacreMissionSnapshot] = queue.Queue()
         """
-        Messages to be sent to the Server. The Worker Thread will block here.
+        Snapshots to be sent to the Server. The Worker Thread will block here.
         """
+        self.__settings_temp = {}
     
     def __worker_thread(self):
         """
         This does NOT run on the main thread!
+
+        Snapshots are immutable, so they can be read here while the main thread publishes newer ones.
         """
         from requests import post 
         # Import anything that is not expected to be on every machine
@@ -72,12 +75,18 @@ class ExampleIntegration(Integration):
             try:
 
                 ### Blocking 
-                entry: MassacreMissionData = self.__message_queue.get()
+                snapshot = self.__message_queue.get()
+                # Each Snapshot contains the full state, so only the newest one has to be sent
+                while not self.__message_queue.empty():
+                    snapshot = self.__message_queue.get_nowait()
 
+                entry = MassacreMissionData.from_summary(snapshot.summary)
                 as_dict = {
+                    "version": snapshot.version,
+                    "cmdr": snapshot.cmdr,
                     "shareable": entry.shareable_reward,
                     "non_shareable": entry.reward,
-                    "missions": map(lambda x: x.__dict__, entry.faction_to_count_lookup.values())
+                    "missions": list(map(lambda x: x.__dict__, entry.faction_to_count_lookup.values()))
                 }
 
                 post(self.__config.post_address, json=as_dict)
@@ -97,6 +106,8 @@ class ExampleIntegration(Integration):
     def notify_initialize(self):
         if not self.is_running and self.__config.is_active:
             self.__start_thread()
+            self.is_running = True
+            massacre_snapshot_listeners.append(self.__message_queue.put)
 
 
 
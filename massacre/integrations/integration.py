@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Optional
 
 class Integration(ABC):
     """
@@ -54,10 +55,20 @@ class Integration(ABC):
     def notify_new_event(self, event) -> None:
         """
         Invoked by the Plugin if there is a new Event passed from EDMC.
+        Only invoked for the Events returned by get_subscribed_events.
 
         Note that this is intentionally note marked with @abstractmethod as not all integrations are expected to require an event
         """
         pass
 
+    def get_subscribed_events(self) -> Optional[set[str]]:
+        """
+        Returns the names of the Events (e.g. "SendText") notify_new_event should be invoked for.
+        Read once, when the Integration is activated.
+
+        None subscribes to all Events. Override this if you only need some, so the Plugin can skip the others.
+        """
+        return None
+
 
     
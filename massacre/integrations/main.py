@@ -2,8 +2,9 @@
 
 
 import tkinter as tk
-from typing import Optional
+from typing import Any, Optional
 from massacre.integrations.integration import Integration
+from massacre.logger_factory import logger
 import myNotebook as nb
 
 from massacre.integrations.overlay.integration import OverlayIntegration
@@ -20,6 +21,11 @@ used by get_all_active once built
 
 only None as long as not initialized
 """
+__SUBSCRIBERS_BY_EVENT: dict[str, list[Integration]] = {}
+"""
+Active Integrations subscribed to each Event Name, including those subscribed to all Events
+"""
+__SUBSCRIBERS_TO_ALL_EVENTS: list[Integration] = []
 
 def __init_state():
     global __ACTIVE_INSTANCES
@@ -33,10 +39,34 @@ def __init_state():
             if result is True:
                 instance.notify_initialize()
                 __ACTIVE_INSTANCES.append(instance)
+                __subscribe(instance)
             else:
                 result_val = result if type(result) is str else None
                 __INACTIVE_INSTANCES.append((instance.get_name(), result_val))
             
+def __subscribe(integration: Integration):
+    events = integration.get_subscribed_events()
+    if events is None:
+        __SUBSCRIBERS_TO_ALL_EVENTS.append(integration)
+        for subscribers in __SUBSCRIBERS_BY_EVENT.values():
+            subscribers.append(integration)
+        return
+    for event in events:
+        __SUBSCRIBERS_BY_EVENT.setdefault(event, list(__SUBSCRIBERS_TO_ALL_EVENTS)).append(integration)
+
+
+def notify_about_event(entry: dict[str, Any]):
+    """
+    Pass a Journal Event to every active Integration subscribed to it
+    """
+    __init_state()
+    for integration in __SUBSCRIBERS_BY_EVENT.get(entry["event"], __SUBSCRIBERS_TO_ALL_EVENTS):
+        try:
+            integration.notify_new_event(entry)
+        except Exception as e:
+            logger.exception(e)
+
+
 def get_all_active() -> list[Integration]:
     """
     Lazy-Init Function that returns all active Integrations
@@ -2,7 +2,7 @@ from typing import Optional
 from massacre import massacre_settings, ui
 from massacre.integrations.integration import Integration
 from massacre.integrations.overlay.overlay import Overlay
-from massacre.massacre_mission_state import massacre_mission_listeners
+from massacre.massacre_mission_state import massacre_snapshot_listeners, MassacreMissionSnapshot
 from massacre.logger_factory import logger
 import tkinter as tk
 import myNotebook as nb
@@ -74,12 +74,13 @@ class OverlayIntegration(Integration):
         if self.__config.overlay_enabled and self.__overlay is None:
             self.__overlay = Overlay(self.__config)
 
-            def handle_new_massacre_mission_state(data: dict[int, ui.MassacreMission]):
-                data_view = ui.MassacreMissionData(data)
+            def handle_new_massacre_mission_state(snapshot: MassacreMissionSnapshot):
+                data_view = ui.MassacreMissionData.from_summary(snapshot.summary)
                 if self.__overlay is not None:
-                    self.__overlay.notify_about_new_massacre_mission_state(data_view)
+                    self.__overlay.notify_about_new_massacre_mission_state(data_view,
+                                                                           ui.build_stack_data(snapshot.stacks))
             
-            massacre_mission_listeners.append(handle_new_massacre_mission_state)
+            massacre_snapshot_listeners.append(handle_new_massacre_mission_state)
 
 
 
@@ -97,6 +98,9 @@ class OverlayIntegration(Integration):
         ttl_frame.grid(sticky=tk.W, padx=settings_offset)
 
 
+    def get_subscribed_events(self) -> Optional[set[str]]:
+        return {"SendText"}
+
     def notify_new_event(self, entry) -> None: 
         if entry["event"] == "SendText" and entry["Message"]:
             if entry["Message"].strip() == "!stack" and self.__overlay is not None:
@@ -1,7 +1,8 @@
 from typing import Optional
 
 from massacre.logger_factory import logger
-from massacre.ui import MassacreMissionData
+from massacre.massacre_mission_aggregate import StackKey
+from massacre.ui import MassacreMissionData, describe_stack
 
 
 
@@ -37,7 +38,7 @@ def __display_sum(data: MassacreMissionData):
     reward_sum = f"{reward_sum_normal} ({reward_sum_wing})"
     return [f'{kill_sum:5}', f'{reward_sum:{len("Reward (Wing)")}}', f'{"Sum":15}']
 
-def _display_data(data: MassacreMissionData):
+def __display_stack(data: MassacreMissionData):
     lines = []
     lines.append('|'.join(__display_data_header()))
 
@@ -46,8 +47,18 @@ def _display_data(data: MassacreMissionData):
     for faction in sorted(data.faction_to_count_lookup.keys()):
         lines.append('|'.join(__display_row(faction, data.faction_to_count_lookup[faction])))
 
-    lines.extend(data.warnings)
+    return lines
+
 
+def _display_data(data: MassacreMissionData, stacks: list[tuple[StackKey, MassacreMissionData]]):
+    if len(stacks) <= 1:
+        return __display_stack(data) + data.warnings
+
+    # A section per Stack
+    lines = []
+    for key, stack in stacks:
+        lines.append(describe_stack(key))
+        lines.extend(__display_stack(stack))
     return lines
 
 
@@ -68,6 +79,7 @@ class Overlay:
     def __init__(self, config):
         self.__config = config
         self.__data: Optional[MassacreMissionData] = None
+        self.__stacks: list[tuple[StackKey, MassacreMissionData]] = []
         self._create_overlay()
                 
     def __bool__(self):
@@ -77,8 +89,10 @@ class Overlay:
         self._create_overlay()
         self.update_overlay()
     
-    def notify_about_new_massacre_mission_state(self, data: Optional[MassacreMissionData]):
+    def notify_about_new_massacre_mission_state(self, data: Optional[MassacreMissionData],
+                                                stacks: Optional[list[tuple[StackKey, MassacreMissionData]]] = None):
         self.__data = data
+        self.__stacks = stacks if stacks is not None else []
         self.update_overlay()
 
     def notify_about_settings_changed(self):
@@ -98,7 +112,7 @@ class Overlay:
         elif self.__data.target_sum == 0:
             lines = _display_waiting_for_missions()
         else:
-            lines = _display_data(self.__data)
+            lines = _display_data(self.__data, self.__stacks)
 
         line_y = 0
         for line in lines:
@@ -0,0 +1,238 @@
+"""
+This Module contains a sorted Catalogue of all Journal Files in the Journal Directory.
+
+The game encodes the start time of a Journal in its file name, so the Catalogue never needs to stat a file to know
+which files are relevant or in which order they have to be read.
+
+Journals that were compressed to save space are part of the Catalogue as well. Both gzip-compressed Journals
+(Journal.<date>.<part>.log.gz) and Journals inside zip-Archives are supported. They are decompressed while
+being read and never extracted to disk.
+"""
+import os
+import re
+import gzip
+import bisect
+import zipfile
+import datetime as dt
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+from massacre.logger_factory import logger
+
+_JOURNAL_NAME_PATTERN = re.compile(r"^Journal\.(\d{4}-\d{2}-\d{2}T\d{6}|\d{12})\.(\d{2})\.log$")
+"""
+Matches both Journal Name formats:
+- Journal.2024-01-31T235959.01.log (Odyssey and newer)
+- Journal.240131235959.01.log (older versions)
+"""
+
+_ZIP_MEMBER_SEPARATOR = "::"
+"""
+Separates the Archive Path and the Member Name in the Location of a Journal inside a zip-Archive.
+"""
+
+
+@dataclass(frozen=True, order=True)
+class JournalFile:
+    """
+    A Journal File. Instances are ordered chronologically.
+    """
+    timestamp: dt.datetime
+    part: int
+    path: Path = field(compare=False)
+    """Path of the Journal, of the gzip-File, or of the zip-Archive containing it"""
+    member: Optional[str] = field(default=None, compare=False)
+    """Name of the Journal inside the zip-Archive. None if this is not in a zip-Archive"""
+
+    @property
+    def name(self) -> str:
+        """
+        The Journal Name (Journal.<date>.<part>.log), regardless of how it is stored
+        """
+        if self.member is not None:
+            return os.path.basename(self.member)
+        return self.path.name[:-len(".gz")] if self.path.name.endswith(".gz") else self.path.name
+
+    @property
+    def is_archived(self) -> bool:
+        """
+        Archived Journals are never written to anymore.
+        """
+        return self.member is not None or self.path.name.endswith(".gz")
+
+    @property
+    def location(self) -> str:
+        """
+        A String which can be passed to open_journal_location to read this Journal again
+        """
+        if self.member is not None:
+            return f"{self.path}{_ZIP_MEMBER_SEPARATOR}{self.member}"
+        return str(self.path)
+
+    def stat(self) -> tuple[int, float]:
+        """
+        Size and Modification Time of the file. For Journals inside zip-Archives those of the Member are used.
+        """
+        if self.member is not None:
+            with zipfile.ZipFile(self.path) as archive:
+                info = archive.getinfo(self.member)
+                return info.file_size, dt.datetime(*info.date_time).timestamp()
+        stat = self.path.stat()
+        return stat.st_size, stat.st_mtime
+
+    def open(self) -> BinaryIO:
+        """
+        Open the Journal for reading binary data. Compressed Journals are decompressed while being read.
+        """
+        if self.member is not None:
+            archive = zipfile.ZipFile(self.path)
+            try:
+                return _ZipMemberReader(archive, archive.open(self.member))
+            except Exception:
+                archive.close()
+                raise
+        if self.path.name.endswith(".gz"):
+            return gzip.open(self.path, "rb")  # type: ignore
+        return open(self.path, "rb")
+
+
+class _ZipMemberReader:
+    """
+    Keeps the zip-Archive open for as long as one of its Members is read.
+    """
+
+    def __init__(self, archive: zipfile.ZipFile, member: BinaryIO):
+        self._archive = archive
+        self._member = member
+
+    def read(self, size: int = -1) -> bytes:
+        return self._member.read(size)
+
+    def readline(self, size: int = -1) -> bytes:
+        return self._member.readline(size)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self._member.seek(offset, whence)
+
+    def close(self):
+        self._member.close()
+        self._archive.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def open_journal_location(location: str) -> BinaryIO:
+    """
+    Open a Journal by its Location (see JournalFile.location)
+    """
+    if _ZIP_MEMBER_SEPARATOR in location:
+        archive_path, member = location.split(_ZIP_MEMBER_SEPARATOR, 1)
+        journal = JournalFile(dt.datetime.min, 0, Path(archive_path), member)
+    else:
+        journal = JournalFile(dt.datetime.min, 0, Path(location))
+    return journal.open()
+
+
+def parse_journal_name(name: str) -> Optional[tuple[dt.datetime, int]]:
+    """
+    Extract the start time and part number from a Journal File Name.
+
+    :return: Tuple of Timestamp and Part, or None if this is not a Journal File Name
+    """
+    match = _JOURNAL_NAME_PATTERN.match(name)
+    if match is None:
+        return None
+    timestamp_str, part_str = match.groups()
+    try:
+        if "T" in timestamp_str:
+            timestamp = dt.datetime.strptime(timestamp_str, "%Y-%m-%dT%H%M%S")
+        else:
+            timestamp = dt.datetime.strptime(timestamp_str, "%y%m%d%H%M%S")
+    except ValueError:
+        return None
+    return timestamp, int(part_str)
+
+
+class JournalCatalogue:
+    """
+    Keeps all Journal Files of a Directory in chronological order.
+    """
+
+    def __init__(self, directory: Path):
+        self._directory = directory
+        self._files: list[JournalFile] = []
+        self._timestamps: list[dt.datetime] = []
+        """Timestamps of _files, kept separately for bisection"""
+        self._archive_members: dict[str, tuple[float, list[JournalFile]]] = {}
+        """Journals found in each zip-Archive by its Modification Time, so Archives are only listed once"""
+
+    @property
+    def directory(self) -> Path:
+        return self._directory
+
+    @property
+    def files(self) -> list[JournalFile]:
+        return self._files
+
+    def __list_archive(self, entry: os.DirEntry) -> list[JournalFile]:
+        mtime = entry.stat().st_mtime
+        cached = self._archive_members.get(entry.path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        members: list[JournalFile] = []
+        try:
+            with zipfile.ZipFile(entry.path) as archive:
+                for member in archive.namelist():
+                    parsed = parse_journal_name(os.path.basename(member))
+                    if parsed is not None:
+                        members.append(JournalFile(parsed[0], parsed[1], Path(entry.path), member))
+        except (OSError, zipfile.BadZipFile):
+            logger.warning(f"Could not read Archive {entry.path}, skipping it.")
+        self._archive_members[entry.path] = (mtime, members)
+        return members
+
+    def refresh(self):
+        """
+        Re-read the directory listing. Only file names are looked at, no Journal is opened or stat-ed.
+        zip-Archives are listed once, and again when they change.
+        """
+        files_by_name: dict[str, JournalFile] = {}
+        try:
+            with os.scandir(self._directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".zip"):
+                        candidates = self.__list_archive(entry)
+                    else:
+                        name = entry.name[:-len(".gz")] if entry.name.endswith(".gz") else entry.name
+                        parsed = parse_journal_name(name)
+                        if parsed is None:
+                            continue
+                        candidates = [JournalFile(parsed[0], parsed[1], Path(entry.path))]
+
+                    for journal in candidates:
+                        # While a Journal is being archived it exists twice. The uncompressed one is preferred.
+                        known = files_by_name.get(journal.name)
+                        if known is None or (known.is_archived and not journal.is_archived):
+                            files_by_name[journal.name] = journal
+        except OSError:
+            logger.exception(f"Failed to list Journal Directory {self._directory}")
+        files = sorted(files_by_name.values())
+        self._files = files
+        self._timestamps = list(map(lambda x: x.timestamp, files))
+
+    def select_after(self, timestamp: dt.date) -> list[JournalFile]:
+        """
+        Return all Journal Files that may contain events after the provided date, in chronological order.
+        This includes the last Journal started before that date, as it may have been written to afterwards.
+        """
+        start = bisect.bisect_left(self._timestamps, dt.datetime.combine(timestamp, dt.time.min))
+        return self._files[max(start - 1, 0):]
+
+    def newest(self) -> Optional[JournalFile]:
+        return self._files[-1] if len(self._files) > 0 else None
@@ -0,0 +1,202 @@
+"""
+This Module passes Journal Events to the Mission Repository, and Kills to the Kill Progress (see kill_progress.py).
+
+It is shared by the Plugin (see load.py, where EDMC passes the events) and the Journal Tailer (see journal_tailer.py,
+which reads them from the Journal itself), so it must not depend on the UI.
+"""
+import datetime as dt
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from massacre.mission_aggregation_helper import build_worker as build_index_worker, build_resolve_worker, \
+    build_resolve_unknown_worker
+from massacre.mission_record import MissionRecord
+from massacre.journal_index import CommanderMissionIndex
+from massacre.logger_factory import logger
+from massacre import mission_repository, kill_progress
+# Registers its Listener for Mission Deltas on import, so every Mission handled here gets its Expiry tracked
+from massacre import mission_expiry  # noqa: F401
+
+mission_index: Optional[CommanderMissionIndex] = None
+"""
+Set by the Thread building the Mission Index once it is done. Used to look up Missions that are not known.
+"""
+
+_current_system: Optional[str] = None
+"""The System the CMDR is in, as of the latest Location-, FSDJump- or CarrierJump-Event. None if not known yet."""
+_is_on_foot = False
+"""Set while the CMDR is on foot, see Embark and Disembark"""
+
+_NON_SHIP_TARGETS = ("suitai", "skimmer")
+"""
+Parts of the Target of a Bounty-Event that are not Ships, e.g. on-foot Enemies (assaultsuitai_class1) or Skimmers.
+Ship Massacre Missions do not count them.
+"""
+
+_journal_directory: Optional[Path] = None
+"""The Journal Directory passed to start_mission_index. None for the one configured in EDMC."""
+
+_on_mission_data_ready: Callable[[], None] = lambda: None
+"""
+Invoked from other Threads once Mission Data is pending. The main thread should then call apply_pending_mission_data.
+"""
+
+
+def start_mission_index(on_mission_data_ready: Callable[[], None], journal_directory: Optional[Path] = None):
+    """
+    Create a new Mission Repository and start building the Mission Index in a new Thread.
+    The Repository buffers all events until it is done.
+
+    :param on_mission_data_ready: Invoked **from other Threads** whenever Mission Data was stored for the
+        Repository. It must make sure that apply_pending_mission_data is called on the main thread.
+    :param journal_directory: The Journals to build the Index from and to resolve Missions with.
+        Defaults to the Journal Directory configured in EDMC.
+    """
+    global _on_mission_data_ready, _journal_directory
+    _on_mission_data_ready = on_mission_data_ready
+    _journal_directory = journal_directory
+
+    mission_repository.set_new_repo()
+    if __resolve_unknown_missions not in mission_repository.unknown_missions_event_listeners:
+        mission_repository.unknown_missions_event_listeners.append(__resolve_unknown_missions)
+
+    logger.info("Building Mission Index in new Thread...")
+    index_thread = build_index_worker(dt.date.today() - dt.timedelta(weeks=2), __notify_repo_about_mission_index,
+                                      journal_directory)
+    index_thread.start()
+
+
+def __notify_repo_about_mission_index(new_mission_index: CommanderMissionIndex):
+    """
+    Callback for the Thread building the Mission Index
+    """
+    global mission_index
+    logger.info(f"Found Missions for {len(new_mission_index.cmdrs)} CMDRs (completed, finished, failed, etc)")
+    mission_index = new_mission_index
+    mission_repository.set_pending_mission_loader(new_mission_index.load)
+    _on_mission_data_ready()
+
+
+def __notify_repo_about_mission_data(mission_uuid_to_mission_lookup: dict[str, dict[int, MissionRecord]]):
+    """
+    Callback for the Threads resolving Missions
+    """
+    mission_repository.set_pending_mission_data(mission_uuid_to_mission_lookup)
+    _on_mission_data_ready()
+
+
+def __start_resolving_missions(uuids: list[int], cmdr: str, active: list[dict[str, Any]]):
+    now = dt.datetime.now()
+    expiries = {int(x["MissionID"]): now + dt.timedelta(seconds=x["Expires"]) for x in active if "Expires" in x}
+    thread = build_resolve_worker(uuids, cmdr, expiries, dt.date.today() - dt.timedelta(weeks=2),
+                                  __notify_repo_about_mission_data, _journal_directory)
+    thread.start()
+
+
+def __resolve_unknown_missions(uuids: list[int], cmdr: str):
+    """
+    Listener for Missions that are active, but not in the Mission Store
+    """
+    if mission_index is None:
+        # The Repository asks again once the Mission Index is passed to it
+        return
+    thread = build_resolve_unknown_worker(mission_index, uuids, cmdr, __notify_repo_about_mission_data)
+    thread.start()
+
+
+def __handle_missions(cmdr: str, entry: dict[str, Any]):
+    # Fetch the currently active missions and pass them to the Mission Registry
+    active_mission_uuids = list(map(lambda x: int(x["MissionID"]), entry["Active"]))
+    if mission_repository.is_building_mission_index():
+        # Do not wait for the full Index. Look up just the active Missions, newest Journals first.
+        __start_resolving_missions(active_mission_uuids, cmdr, entry["Active"])
+    mission_repository.set_active_uuids(active_mission_uuids, cmdr)
+
+
+def __handle_mission_accepted(cmdr: str, entry: dict[str, Any]):
+    # A new mission has been accepted. The Mission Repository should be notified about this
+    repository = mission_repository.mission_repository
+    if repository is not None:
+        repository.notify_about_new_mission_accepted(entry, cmdr)
+
+
+def __handle_mission_redirected(_cmdr: str, entry: dict[str, Any]):
+    #增加任务目标完成的处理，此处是处理“事件”
+    repository = mission_repository.mission_repository
+    if repository is not None:
+        repository.notify_complete_mission_gone(entry["MissionID"])
+
+
+def __handle_mission_gone(_cmdr: str, entry: dict[str, Any]):
+    # Mission has been completed, abandoned or failed (e.g. it expired) -> It is no longer active
+    repository = mission_repository.mission_repository
+    if repository is not None:
+        repository.notify_about_mission_gone(entry["MissionID"])
+
+
+def __handle_kill(_cmdr: str, entry: dict[str, Any]):
+    # Bounty (and FactionKillBond in Conflict Zones) is sent for every Kill
+    victim_faction = entry.get("VictimFaction")
+    if victim_faction is None or _is_on_foot:
+        return
+    target = str(entry.get("Target", "")).lower()
+    if any(map(lambda x: x in target, _NON_SHIP_TARGETS)):
+        return
+    kill_progress.notify_about_kill(victim_faction, _current_system)
+
+
+def __handle_location(_cmdr: str, entry: dict[str, Any]):
+    global _current_system, _is_on_foot
+    _current_system = entry.get("StarSystem")
+    if entry["event"] == "Location":
+        _is_on_foot = bool(entry.get("OnFoot", False))
+
+
+def __handle_load_game(_cmdr: str, _entry: dict[str, Any]):
+    # The Location-Event follows
+    global _current_system, _is_on_foot
+    _current_system = None
+    _is_on_foot = False
+
+
+def __handle_embark(_cmdr: str, entry: dict[str, Any]):
+    global _is_on_foot
+    _is_on_foot = entry["event"] == "Disembark"
+
+
+event_handlers: dict[str, Callable[[str, dict[str, Any]], None]] = {
+    "Missions": __handle_missions,
+    "MissionAccepted": __handle_mission_accepted,
+    "MissionRedirected": __handle_mission_redirected,
+    "MissionAbandoned": __handle_mission_gone,
+    "MissionCompleted": __handle_mission_gone,
+    "MissionFailed": __handle_mission_gone,
+    "Bounty": __handle_kill,
+    "FactionKillBond": __handle_kill,
+    "LoadGame": __handle_load_game,
+    "Location": __handle_location,
+    "FSDJump": __handle_location,
+    "CarrierJump": __handle_location,
+    "Embark": __handle_embark,
+    "Disembark": __handle_embark,
+}
+"""
+Handler for each Journal Event the Mission Pipeline needs, by Event Name. Callback: (cmdr, event) -> void
+"""
+
+
+def handle_journal_event(cmdr: str, entry: dict[str, Any], system: Optional[str] = None):
+    """
+    Pass a Journal Event to the Mission Repository. Events that are not Mission-related are ignored.
+
+    **To be called from the main thread.**
+
+    :param system: The System EDMC considers the CMDR to be in. Only used while no Location-Event was seen yet,
+                   e.g. when the Plugin is started mid-session.
+    """
+    global _current_system
+    if _current_system is None and system:
+        _current_system = system
+    handler = event_handlers.get(entry["event"])
+    if handler is not None:
+        handler(cmdr, entry)
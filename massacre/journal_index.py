@@ -0,0 +1,397 @@
+"""
+This Module contains a persistent Index over the Mission-Events found in the Journal Files.
+
+Journal Files never change once the game has moved on to the next file, so reading them again on every start
+is wasted work. The Index remembers for each Journal File how far it has been read (size, mtime and byte offset)
+together with the Mission-Events found up to that point. On the next start only the bytes added since then are parsed.
+"""
+import json
+import bisect
+import os
+import time
+from dataclasses import dataclass, field
+from os.path import dirname
+from pathlib import Path
+from typing import Any, BinaryIO, Optional
+
+from massacre import json_decoder
+from massacre.logger_factory import logger
+from massacre.mission_record import MissionRecord
+from massacre.journal_catalogue import JournalFile
+
+INDEX_VERSION = 5
+"""
+Version of the Index File layout. Index Files with a different version are discarded and rebuilt.
+"""
+
+index_file_location = Path(dirname(__file__)).parent / "journal_index.json"
+"""
+The Index is stored next to the Plugin so it is removed together with it.
+"""
+
+
+@dataclass
+class JournalFileEntry:
+    """
+    Checkpoint and parse result of a single Journal File
+    """
+    size: int
+    mtime: float
+    offset: int
+    """
+    Byte Offset up to which the file has been parsed. This always points to the start of a line.
+    """
+    segments: Optional[list[list]] = field(default_factory=list)
+    """
+    Mission-Events of this file, split by CMDR. Each segment is a list of [CMDR Name, list of Events].
+    The CMDR Name is None for events that were logged before the first Commander-Event in this file. Those
+    belong to the CMDR of the previous file.
+
+    Events are stored compactly as lists starting with the Event Name and the Mission ID:
+    - ["MissionAccepted", *MissionRecord.as_list()]
+    - ["MissionRedirected", Mission ID]
+
+    None once the Journal is older than the lookback, only the Mission IDs are kept then.
+    """
+    mission_ids: list[int] = field(default_factory=list)
+    """
+    Sorted IDs of all Missions accepted in this file. Used to find the one file containing a Mission.
+    """
+
+    def as_dict(self):
+        as_dict = {
+            "size": self.size,
+            "mtime": self.mtime,
+            "offset": self.offset,
+            "segments": self.segments,
+            "mission_ids": self.mission_ids
+        }
+        return as_dict
+
+    @staticmethod
+    def from_dict(data: dict) -> "JournalFileEntry":
+        return JournalFileEntry(data["size"], data["mtime"], data["offset"], data["segments"], data["mission_ids"])
+
+    def contains_mission(self, mission_id: int) -> bool:
+        position = bisect.bisect_left(self.mission_ids, mission_id)
+        return position < len(self.mission_ids) and self.mission_ids[position] == mission_id
+
+    def append_segments(self, segments: list[list]):
+        """
+        Add segments parsed from newly appended bytes. A leading segment without CMDR continues the last one.
+        """
+        assert self.segments is not None
+        new_mission_ids = [event[1] for segment in segments for event in segment[1] if event[0] == "MissionAccepted"]
+        if len(new_mission_ids) > 0:
+            self.mission_ids = sorted(set(self.mission_ids).union(new_mission_ids))
+        for segment in segments:
+            if segment[0] is None and len(self.segments) > 0:
+                self.segments[-1][1].extend(segment[1])
+            else:
+                self.segments.append(segment)
+
+
+_CHUNK_SIZE = 1 << 20
+"""
+Journal Files are read in chunks of this many bytes.
+"""
+
+_EVENT_MARKERS = (b'"Commander"', b'"MissionAccepted"', b'"MissionRedirected"')
+"""
+Raw byte patterns of the relevant Event Names. Only lines containing one of these are decoded, which skips the
+thousands of Scan-, Music-, etc. Events. A false positive is harmless, the decoded event is checked again.
+"""
+
+
+def __find_relevant_lines(chunk: bytes, chunk_offset: int) -> list[tuple[int, bytes]]:
+    """
+    Return all lines of a chunk (which only contains complete lines) that contain an Event Marker, in file order.
+
+    :return: List of (Byte Offset of the line in the file, line)
+    """
+    line_bounds: set[tuple[int, int]] = set()
+    for marker in _EVENT_MARKERS:
+        position = chunk.find(marker)
+        while position != -1:
+            start = chunk.rfind(b"\n", 0, position) + 1
+            end = chunk.find(b"\n", position) + 1
+            line_bounds.add((start, end))
+            position = chunk.find(marker, end)
+    return [(chunk_offset + start, chunk[start:end]) for start, end in sorted(line_bounds)]
+
+
+def _read_relevant_lines(log_file: BinaryIO, offset: int) -> tuple[list[tuple[int, bytes]], int]:
+    """
+    Stream a binary Journal File from its current position in large chunks and collect the lines that contain
+    an Event Marker. Only complete lines are consumed, as the game might still be writing the last one.
+
+    :return: Tuple of the relevant lines (with their offsets) and the offset after the last complete line
+    """
+    relevant_lines: list[tuple[int, bytes]] = []
+    leftover = b""
+    while True:
+        chunk = log_file.read(_CHUNK_SIZE)
+        if chunk == b"":
+            break
+        buffer = leftover + chunk
+        last_line_end = buffer.rfind(b"\n") + 1
+        leftover = buffer[last_line_end:]
+        if last_line_end == 0:
+            continue
+        relevant_lines.extend(__find_relevant_lines(buffer[:last_line_end], offset))
+        offset += last_line_end
+    return relevant_lines, offset
+
+
+def parse_journal_file(journal: JournalFile, offset: int = 0) -> tuple[list[list], int]:
+    """
+    Parse the Mission-Events of a Journal File, starting at the provided byte offset.
+
+    :return: Tuple of the found segments (see JournalFileEntry) and the offset after the last complete line
+    """
+    segments: list[list] = []
+    current_segment: list = [None, []]
+
+    with journal.open() as log_file:
+        if offset > 0:
+            log_file.seek(offset)
+        lines, offset = _read_relevant_lines(log_file, offset)
+
+    decoded: list[tuple[int, Any]] = []
+    start = time.perf_counter()
+    for line_offset, line in lines:
+        try:
+            decoded.append((line_offset, json_decoder.loads(line)))
+        except Exception:
+            logger.warning("Could not decode line, skipping it.")
+    json_decoder.record_decoding(len(lines), sum(map(lambda x: len(x[1]), lines)), time.perf_counter() - start)
+
+    for line_offset, line_as_json in decoded:
+        try:
+            event = line_as_json["event"]
+
+            if event == "Commander":
+                if current_segment[0] is not None or len(current_segment[1]) > 0:
+                    segments.append(current_segment)
+                current_segment = [str(line_as_json["Name"]), []]
+            elif event == "MissionAccepted":
+                record = MissionRecord.from_event(line_as_json, (journal.location, line_offset))
+                current_segment[1].append([event, *record.as_list()])
+            elif event == "MissionRedirected":
+                # Only the ID is needed. A Redirect marks the kill target of the Mission as completed.
+                current_segment[1].append([event, line_as_json["MissionID"]])
+        except Exception:
+            logger.warning("An error occurred, skipping line.")
+
+    if current_segment[0] is not None or len(current_segment[1]) > 0:
+        segments.append(current_segment)
+    return segments, offset
+
+
+class JournalIndex:
+    """
+    The Journal Index keeps a JournalFileEntry per Journal File (by file name) and persists them in the Index File.
+    """
+
+    def __init__(self, entries: Optional[dict[str, JournalFileEntry]] = None):
+        self._entries: dict[str, JournalFileEntry] = entries if entries is not None else {}
+
+    @staticmethod
+    def load(location: Path = index_file_location) -> "JournalIndex":
+        """
+        Load the Index from disk. If there is no usable Index File an empty Index is returned.
+        """
+        if not location.is_file():
+            logger.info("No Journal Index found. Building a new one.")
+            return JournalIndex()
+        try:
+            with open(location, "r", encoding="utf8") as index_file:
+                data = json.load(index_file)
+            if data.get("version") != INDEX_VERSION:
+                logger.info("Journal Index has an outdated version. Building a new one.")
+                return JournalIndex()
+            entries = {name: JournalFileEntry.from_dict(entry) for name, entry in data["files"].items()}
+            return JournalIndex(entries)
+        except Exception:
+            logger.exception("Failed to load the Journal Index. Building a new one.")
+            return JournalIndex()
+
+    def save(self, location: Path = index_file_location):
+        """
+        Write the Index to disk. The file is replaced atomically so a crash never leaves a half-written Index.
+        """
+        data = {
+            "version": INDEX_VERSION,
+            "files": {name: entry.as_dict() for name, entry in self._entries.items()}
+        }
+        temp_location = location.with_suffix(".tmp")
+        try:
+            with open(temp_location, "w", encoding="utf8") as index_file:
+                json.dump(data, index_file, separators=(",", ":"))
+            os.replace(temp_location, location)
+        except Exception:
+            logger.exception("Failed to save the Journal Index")
+
+    def update(self, journals: list[JournalFile], retained: Optional[list[JournalFile]] = None):
+        """
+        Bring the Index up to date with the provided Journal Files. Files that are unchanged are skipped, files that
+        grew are only parsed from their last offset. Archived Journals are parsed from the start if they changed,
+        as their size is not comparable.
+
+        For the retained Journals (older than the provided ones) only the Mission IDs are kept.
+        Entries for all other files are dropped.
+        """
+        known_names = set(map(lambda x: x.name, journals))
+        retained_names = set(map(lambda x: x.name, retained if retained is not None else []))
+        for name in list(self._entries.keys()):
+            if name in retained_names and name not in known_names:
+                self._entries[name].segments = None
+            elif name not in known_names:
+                del self._entries[name]
+
+        reused = 0
+        jobs: list[tuple[JournalFile, int, tuple[int, float]]] = []
+        """Files that need parsing as (Journal, Offset to start at, Size and mtime at the time of parsing)"""
+        for journal in journals:
+            try:
+                stat = journal.stat()
+            except Exception:
+                logger.warning(f"Could not stat {journal.location}, skipping it.")
+                continue
+            size, mtime = stat
+            entry = self._entries.get(journal.name)
+
+            if entry is not None and entry.segments is None:
+                logger.debug(f"Opening file {journal.location} again ...")
+                jobs.append((journal, 0, stat))
+            elif entry is not None and entry.size == size and entry.mtime == mtime:
+                reused += 1
+            elif entry is not None and not journal.is_archived and size >= entry.size:
+                logger.debug(f"Continuing file {journal.location} at offset {entry.offset} ...")
+                jobs.append((journal, entry.offset, stat))
+            else:
+                logger.debug(f"Opening file {journal.location} ...")
+                jobs.append((journal, 0, stat))
+
+        # Files are parsed one after another in file order, so the CMDR carry-over between files stays exact.
+        # Parsing is bound by the GIL, so parsing several files in Threads at once would not be faster.
+        for journal, start_offset, (size, mtime) in jobs:
+            segments, offset = parse_journal_file(journal, start_offset)
+            if start_offset > 0:
+                entry = self._entries[journal.name]
+                entry.append_segments(segments)
+            else:
+                entry = JournalFileEntry(0, 0, 0, [])
+                entry.append_segments(segments)
+                self._entries[journal.name] = entry
+            entry.size = size
+            entry.mtime = mtime
+            entry.offset = offset
+
+        logger.info(f"Journal Index: {reused} of {len(journals)} Logs unchanged since last start")
+        json_decoder.log_backend()
+
+    def group_by_cmdr(self, journals: list[JournalFile],
+                      mission_id_index: Optional[list[tuple[JournalFile, JournalFileEntry]]] = None) \
+            -> "CommanderMissionIndex":
+        """
+        Assign the indexed segments of the provided Journal Files (in the given order) to their CMDRs.
+        No Mission Record is built here, see CommanderMissionIndex.load.
+
+        :param mission_id_index: Passed on to the CommanderMissionIndex, see build_mission_id_index
+        """
+        current_name: str = ""
+        segments_by_cmdr: dict[str, list[tuple[str, list[list]]]] = {}
+
+        for journal in journals:
+            entry = self._entries.get(journal.name)
+            if entry is None or entry.segments is None:
+                continue
+            location = journal.location
+            for name, events in entry.segments:
+                if name is not None:
+                    current_name = name
+                if current_name == "":
+                    continue
+                segments_by_cmdr.setdefault(current_name, []).append((location, events))
+
+        return CommanderMissionIndex(segments_by_cmdr, mission_id_index)
+
+    def build_mission_id_index(self, journals: list[JournalFile]) -> list[tuple[JournalFile, JournalFileEntry]]:
+        """
+        Return the Entries of all provided Journal Files that are in this Index, to look up Missions by their ID.
+        """
+        mission_id_index = []
+        for journal in journals:
+            entry = self._entries.get(journal.name)
+            if entry is not None:
+                mission_id_index.append((journal, entry))
+        return mission_id_index
+
+
+class CommanderMissionIndex:
+    """
+    The Mission-Events of the Journal Index, split by CMDR. Mission Records are only built for a CMDR once
+    load is called, so CMDRs that are not played this session cost next to nothing.
+    """
+
+    def __init__(self, segments_by_cmdr: dict[str, list[tuple[str, list[list]]]],
+                 mission_id_index: Optional[list[tuple[JournalFile, JournalFileEntry]]] = None):
+        self._segments_by_cmdr = segments_by_cmdr
+        """
+        CMDR Name -> list of (Journal Location, Events), in chronological order
+        """
+        self._mission_id_index = mission_id_index if mission_id_index is not None else []
+        """
+        Journal Files with their Entry, including Journals older than the lookback. See locate.
+        """
+        self._redirected_ids: Optional[set[int]] = None
+
+    def locate(self, mission_id: int) -> Optional[JournalFile]:
+        """
+        Find the Journal File in which a Mission was accepted, using the Mission IDs of each Journal.
+
+        :return: The Journal File, or None if no indexed Journal contains the Mission
+        """
+        for journal, entry in reversed(self._mission_id_index):
+            if entry.contains_mission(mission_id):
+                return journal
+        return None
+
+    def is_redirected(self, mission_id: int) -> bool:
+        """
+        True if a MissionRedirected-Event for the Mission is found in any Journal inside the lookback
+        """
+        redirected_ids = self._redirected_ids
+        if redirected_ids is None:
+            # Only publish the complete Set, a concurrent caller must never see it half-filled
+            redirected_ids = set()
+            for segments in self._segments_by_cmdr.values():
+                for _location, events in segments:
+                    for event in events:
+                        if event[0] == "MissionRedirected":
+                            redirected_ids.add(event[1])
+            self._redirected_ids = redirected_ids
+        return mission_id in redirected_ids
+
+    @property
+    def cmdrs(self) -> list[str]:
+        return list(self._segments_by_cmdr.keys())
+
+    def load(self, cmdr: str) -> dict[int, MissionRecord]:
+        """
+        Replay the Mission-Events of the CMDR.
+
+        :return: Dictionary[Mission ID, Mission Record]. Empty if the CMDR is unknown.
+        """
+        missions: dict[int, MissionRecord] = {}
+        for location, events in self._segments_by_cmdr.get(cmdr, []):
+            for event in events:
+                mission_id = event[1]
+                if event[0] == "MissionAccepted":
+                    missions[mission_id] = MissionRecord.from_list(event[1:], location)
+                elif event[0] == "MissionRedirected" and mission_id in missions:
+                    # A Redirect of a known Mission means its kill target is done. 任务目标完成
+                    missions[mission_id].is_completed = True
+        logger.info(f"Loaded {len(missions)} Missions for CMDR {cmdr} from the Journal Index")
+        return missions
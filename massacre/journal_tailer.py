@@ -0,0 +1,292 @@
+"""
+This Module contains a Journal Tailer, which follows the newest Journal File and passes every new event on.
+
+It allows running the Mission Pipeline without EDMC passing the events, e.g. on a second machine with access to
+the Journal Directory or in a test harness:
+
+    python -m massacre.journal_tailer [Journal Directory]
+
+EDMC's Source Directory has to be on the PYTHONPATH, as its config Module is used to locate the Journal Directory.
+
+On Linux the Journal Directory is watched with inotify, so new events are read within milliseconds. Elsewhere the
+newest Journal is polled. In both cases only the bytes appended since the last read are read.
+"""
+import os
+import sys
+import time
+import select
+import struct
+import threading
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Optional
+
+from massacre import json_decoder
+from massacre.journal_catalogue import JournalCatalogue, JournalFile
+from massacre.logger_factory import logger
+
+_IN_MODIFY = 0x002
+_IN_CREATE = 0x100
+_IN_MOVED_TO = 0x080
+_INOTIFY_EVENT = struct.Struct("iIII")
+"""struct inotify_event without the trailing name: wd, mask, cookie, len"""
+
+_POLLING_RESCAN_INTERVAL = 1.0
+"""Seconds between two directory listings while polling. New Journals are found at most this late."""
+
+
+class _InotifyWatcher:
+    """
+    Wakes up as soon as any file in the Journal Directory is changed. Linux only.
+    """
+
+    def __init__(self, directory: Path):
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self._fd, os.fsencode(directory), _IN_MODIFY | _IN_CREATE | _IN_MOVED_TO) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Wait until a file was changed or the timeout passed.
+
+        :return: True if a Journal was created, i.e. the directory has to be listed again
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if len(readable) == 0:
+            return False
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+
+        journal_created = False
+        position = 0
+        while position + _INOTIFY_EVENT.size <= len(data):
+            _, mask, _, name_length = _INOTIFY_EVENT.unpack_from(data, position)
+            name = data[position + _INOTIFY_EVENT.size:position + _INOTIFY_EVENT.size + name_length]
+            if mask & (_IN_CREATE | _IN_MOVED_TO) and name.startswith(b"Journal."):
+                journal_created = True
+            position += _INOTIFY_EVENT.size + name_length
+        return journal_created
+
+    def close(self):
+        os.close(self._fd)
+
+
+class _PollingWatcher:
+    """
+    Sleeps for the timeout. The directory is listed again every _POLLING_RESCAN_INTERVAL seconds.
+    """
+
+    def __init__(self):
+        self._last_rescan = time.monotonic()
+
+    def wait(self, timeout: float) -> bool:
+        time.sleep(timeout)
+        now = time.monotonic()
+        if now - self._last_rescan < _POLLING_RESCAN_INTERVAL:
+            return False
+        self._last_rescan = now
+        return True
+
+    def close(self):
+        pass
+
+
+def _build_watcher(directory: Path):
+    if sys.platform.startswith("linux"):
+        try:
+            return _InotifyWatcher(directory)
+        except (OSError, AttributeError):
+            logger.warning("inotify is not available, polling the Journal Directory instead.", exc_info=True)
+    return _PollingWatcher()
+
+
+class JournalTailer:
+    """
+    Follows the newest Journal File of a Directory and passes each new event to a Callback, together with the
+    CMDR found in the Journal so far. Switches to the next Journal once the game starts a new one.
+    """
+
+    def __init__(self, directory: Path, on_event: Callable[[Optional[str], dict[str, Any]], None],
+                 poll_interval: float = 0.25, from_start: bool = True):
+        """
+        :param on_event: Callback, invoked with the CMDR (None until a Commander-Event was read) and the Event
+        :param poll_interval: Seconds between two reads while polling. With inotify this is the longest time
+            run waits before it checks whether it was stopped.
+        :param from_start: Pass all events of the newest Journal first. Otherwise only new events are passed.
+        """
+        self._directory = directory
+        self._on_event = on_event
+        self._poll_interval = poll_interval
+        self._from_start = from_start
+        self._catalogue = JournalCatalogue(directory)
+        self._journal: Optional[JournalFile] = None
+        self._log_file: Optional[BinaryIO] = None
+        self._offset = 0
+        """Byte Offset up to which the Journal has been read"""
+        self._partial_line = b""
+        """The end of the Journal, if the game has not finished writing the line yet"""
+        self._cmdr: Optional[str] = None
+
+    @property
+    def cmdr(self) -> Optional[str]:
+        return self._cmdr
+
+    @property
+    def journal(self) -> Optional[JournalFile]:
+        """The Journal that is currently followed"""
+        return self._journal
+
+    def __open(self, journal: JournalFile, skip_existing: bool):
+        self.close()
+        logger.info(f"Following Journal {journal.name}")
+        self._journal = journal
+        self._log_file = journal.open()
+        self._offset = self._log_file.seek(0, os.SEEK_END) if skip_existing else 0
+        self._log_file.seek(self._offset)
+
+    def check_rollover(self) -> bool:
+        """
+        List the Journal Directory and switch to the newest Journal if the game started a new one.
+        The rest of the current Journal is read first.
+
+        :return: True if another Journal is followed now
+        """
+        self._catalogue.refresh()
+        newest = self._catalogue.newest()
+        if newest is None or newest.is_archived or newest == self._journal:
+            return False
+        if self._journal is None:
+            self.__open(newest, not self._from_start)
+        else:
+            self.poll()
+            self.__open(newest, False)
+        return True
+
+    def poll(self) -> int:
+        """
+        Read the bytes appended to the current Journal and pass on every complete line.
+
+        :return: The number of events passed on
+        """
+        if self._log_file is None:
+            return 0
+        try:
+            if os.fstat(self._log_file.fileno()).st_size < self._offset:  # type: ignore
+                logger.warning(f"Journal {self._journal.name} was truncated. Reading it from the start.")
+                self._offset = 0
+                self._partial_line = b""
+                self._log_file.seek(0)
+            data = self._log_file.read()
+        except OSError:
+            logger.exception(f"Failed to read Journal {self._journal.name}")
+            return 0
+        if not data:
+            return 0
+
+        self._offset += len(data)
+        data = self._partial_line + data
+        end = data.rfind(b"\n") + 1
+        self._partial_line = data[end:]
+
+        count = 0
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                entry = json_decoder.loads(line)
+            except ValueError:
+                logger.warning(f"Skipping malformed line in Journal {self._journal.name}")
+                continue
+            if entry.get("event") == "Commander":
+                self._cmdr = entry.get("Name")
+            elif entry.get("event") == "LoadGame":
+                self._cmdr = entry.get("Commander", self._cmdr)
+            self._on_event(self._cmdr, entry)
+            count += 1
+        return count
+
+    def run(self, stop: threading.Event, on_idle: Optional[Callable[[], None]] = None):
+        """
+        Follow the Journals until stop is set. Blocks, so this is usually run in its own Thread.
+
+        :param on_idle: Invoked after every read, e.g. to apply Mission Data passed by other Threads
+        """
+        watcher = _build_watcher(self._directory)
+        try:
+            self.check_rollover()
+            while not stop.is_set():
+                self.poll()
+                if on_idle is not None:
+                    on_idle()
+                if watcher.wait(self._poll_interval):
+                    self.check_rollover()
+        finally:
+            watcher.close()
+            self.close()
+
+    def close(self):
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
+
+
+def build_worker(directory: Path, on_event: Callable[[Optional[str], dict[str, Any]], None], stop: threading.Event,
+                 on_idle: Optional[Callable[[], None]] = None) -> threading.Thread:
+    """
+    Build a Thread following the Journals of the Directory until stop is set. The Callbacks are invoked
+    from that Thread.
+    """
+    tailer = JournalTailer(directory, on_event)
+    thread = threading.Thread(target=tailer.run, name="Massacre Plugin Journal Tailer", args=(stop, on_idle))
+    thread.daemon = True
+    return thread
+
+
+def __log_massacre_missions(missions: dict):
+    total_reward = sum(map(lambda x: x.reward, missions.values()))
+    logger.info(f"{len(missions)} Massacre Missions active, {total_reward:,} Cr in total")
+
+
+def __main():
+    """
+    Run the Mission Pipeline on the events read by the Journal Tailer, without EDMC.
+    The Mission Index is built in another Thread, everything else happens on this one.
+    """
+    from massacre import journal_events, mission_expiry
+    from massacre.mission_aggregation_helper import file_location
+    from massacre.mission_repository import apply_pending_mission_data
+    from massacre.massacre_mission_state import massacre_mission_listeners
+    from massacre.update_scheduler import scheduler
+
+    directory = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(file_location)
+    massacre_mission_listeners.append(__log_massacre_missions)
+
+    def handle_event(cmdr: Optional[str], entry: dict[str, Any]):
+        if cmdr is not None:
+            journal_events.handle_journal_event(cmdr, entry)
+
+    def on_idle():
+        apply_pending_mission_data()
+        mission_expiry.expire_due_missions()
+        scheduler.flush()
+
+    # Mission Data is applied and updates are run after every read, so there is nothing to wake up
+    journal_events.start_mission_index(lambda: None, directory)
+    scheduler.set_dispatcher(lambda _: None)
+    stop = threading.Event()
+    try:
+        JournalTailer(directory, handle_event).run(stop, on_idle)
+    except KeyboardInterrupt:
+        stop.set()
+
+
+if __name__ == "__main__":
+    __main()
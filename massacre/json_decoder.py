@@ -0,0 +1,86 @@
+"""
+This Module selects the JSON Decoder used to parse Journal Lines.
+
+orjson or msgspec are used if they can be imported, as they decode Journal Lines several times faster than the
+json Module. Otherwise the json Module is used. tests/test_json_decoder.py checks that they decode Journal Lines
+exactly like the json Module.
+
+How fast the Journal Lines are decoded is measured while the Journal Index is built, see record_decoding.
+"""
+import json
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Union
+
+from massacre.logger_factory import logger
+
+
+def __json_loads(data: Union[bytes, str]) -> Any:
+    return json.loads(data)
+
+
+def available_backends() -> list[tuple[str, Callable[[Union[bytes, str]], Any]]]:
+    """
+    All Decoders that can be imported, fastest first. The json Module is always last.
+    """
+    backends: list[tuple[str, Callable[[Union[bytes, str]], Any]]] = []
+    try:
+        import orjson  # pyright: ignore
+        backends.append(("orjson", orjson.loads))
+    except ImportError:
+        pass
+    try:
+        import msgspec  # pyright: ignore
+        backends.append(("msgspec", msgspec.json.Decoder().decode))
+    except ImportError:
+        pass
+    backends.append(("json", __json_loads))
+    return backends
+
+
+backend_name, loads = available_backends()[0]
+"""
+Name of the selected Decoder and its decode Function. loads accepts bytes and str, like json.loads.
+"""
+
+
+@dataclass
+class DecoderMetrics:
+    """
+    Journal Lines decoded so far, see record_decoding
+    """
+    lines: int = 0
+    size: int = 0
+    """Bytes decoded"""
+    seconds: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """MB/s"""
+        return self.size / self.seconds / 1_000_000 if self.seconds > 0 else 0.0
+
+
+metrics = DecoderMetrics()
+_metrics_lock = threading.Lock()
+
+
+def record_decoding(lines: int, size: int, seconds: float):
+    """
+    Add Journal Lines decoded with loads to the metrics. Can be called from any Thread.
+    """
+    with _metrics_lock:
+        metrics.lines += lines
+        metrics.size += size
+        metrics.seconds += seconds
+
+
+def log_backend():
+    """
+    Log which Decoder is used and how fast it decoded the Journal Lines so far
+    """
+    with _metrics_lock:
+        if metrics.lines == 0:
+            logger.info(f"Using JSON Decoder {backend_name}")
+            return
+        logger.info(f"Using JSON Decoder {backend_name}: {metrics.lines} Journal Lines "
+                    f"({metrics.size / 1_000_000:.1f} MB) decoded at {metrics.throughput:.1f} MB/s")
@@ -0,0 +1,131 @@
+"""
+This Module tracks the Kills done for active Massacre Missions, as reported by Bounty- and FactionKillBond-Events.
+
+The game credits a Kill of the Target Faction to one Mission of every Faction that handed out Massacre Missions
+against it: the oldest one that still needs Kills. Only Missions for the System the Kill happened in count, and
+Missions to kill clean Ships (e.g. Civilians) never yield a Bounty. So the Missions are indexed by Target Faction,
+then by Stack (see StackKey) and Source Faction, in the order they were accepted. A Kill only looks at the first
+Mission of each of these queues. The progress is kept per Stack as well, so Kills in one System do not count for the
+Stack of another System.
+
+The game does not report the progress of Missions, so Kills done while the Plugin was not running are not known.
+They are picked up once the Mission is completed (see MissionRedirected).
+"""
+from collections import deque
+from types import MappingProxyType
+from typing import Callable, Mapping, Optional
+
+from massacre.massacre_mission_aggregate import StackKey
+from massacre.massacre_mission_state import MassacreMission, massacre_store_changed_listeners
+from massacre.update_scheduler import scheduler
+
+kill_progress_listeners: list[Callable[[Mapping[tuple[StackKey, str], int]], None]] = []
+"""
+Invoked on the main thread with the Kills done for Missions that are not completed yet, by (Stack, Source Faction).
+The Mapping is read-only.
+"""
+
+_cmdr: Optional[str] = None
+_kills_by_cmdr: dict[Optional[str], dict[int, int]] = {}
+"""Kills done per Mission ID, for every CMDR seen so far"""
+_CLEAN_TARGET_TYPES = frozenset(["$MissionUtil_FactionTag_Civilian;", "$MissionUtil_FactionTag_PoliceForces;"])
+"""
+Target Types of Missions to kill clean Ships. These Kills are crimes, so they are not reported by Bounty- or
+FactionKillBond-Events.
+"""
+
+_queues: dict[str, dict[tuple[StackKey, str], deque[MassacreMission]]] = {}
+"""Missions that still need Kills, by Target Faction, then by (Stack, Source Faction), oldest first"""
+_kills_by_faction: dict[tuple[StackKey, str], int] = {}
+"""Kills done for Missions that are not completed yet, by (Stack, Source Faction)"""
+
+
+def get_kill_progress() -> Mapping[tuple[StackKey, str], int]:
+    """
+    Return the Kills done for Missions that are not completed yet, by (Stack, Source Faction)
+    """
+    return MappingProxyType(dict(_kills_by_faction))
+
+
+def get_kills_done(mission_id: int) -> int:
+    """
+    Return the Kills done for a Mission of the current CMDR that is not completed yet
+    """
+    return _kills_by_cmdr.get(_cmdr, {}).get(mission_id, 0)
+
+
+def __handle_store_changed(cmdr: Optional[str], missions: Mapping[int, MassacreMission]):
+    """
+    Rebuild the Index from the active Massacre Missions. Kills of Missions that are gone or completed are dropped.
+    """
+    global _cmdr, _queues, _kills_by_faction
+    _cmdr = cmdr
+    kills = _kills_by_cmdr.setdefault(cmdr, {})
+    for uuid in [x for x in kills if x not in missions or missions[x].is_completed]:
+        del kills[uuid]
+
+    queues: dict[str, dict[tuple[StackKey, str], deque[MassacreMission]]] = {}
+    kills_by_faction: dict[tuple[StackKey, str], int] = {}
+    # Mission IDs are handed out in ascending order, so this is the order the Missions were accepted in
+    for uuid in sorted(missions.keys()):
+        mission = missions[uuid]
+        if mission.is_completed:
+            continue
+        done = kills.get(uuid, 0)
+        key = (StackKey.of(mission), mission.source_faction)
+        kills_by_faction[key] = kills_by_faction.get(key, 0) + done
+        if done < mission.count and mission.target_type not in _CLEAN_TARGET_TYPES:
+            queues.setdefault(mission.target_faction, {}).setdefault(key, deque()).append(mission)
+
+    _queues = queues
+    if kills_by_faction != _kills_by_faction:
+        _kills_by_faction = kills_by_faction
+        scheduler.schedule("kill_progress", __emit_kill_progress)
+
+
+def notify_about_kill(victim_faction: str, system: Optional[str] = None):
+    """
+    Credit a Ship Kill of the given Faction to the oldest Mission of every Source Faction that targets it.
+    Costs O(Queues of the Faction).
+
+    :param system: The System the Kill happened in. If it is not known, Missions for any System are credited.
+    """
+    queues = _queues.get(victim_faction)
+    if queues is None:
+        return
+    oldest_by_source_faction: dict[str, tuple[StackKey, str]] = {}
+    for queue_key, queue in queues.items():
+        stack, source_faction = queue_key
+        if system is not None and stack.target_system != "" and stack.target_system != system:
+            continue
+        oldest = oldest_by_source_faction.get(source_faction)
+        if oldest is None or queue[0].id < queues[oldest][0].id:
+            oldest_by_source_faction[source_faction] = queue_key
+    if len(oldest_by_source_faction) == 0:
+        return
+
+    kills = _kills_by_cmdr.setdefault(_cmdr, {})
+    for queue_key in oldest_by_source_faction.values():
+        queue = queues[queue_key]
+        mission = queue[0]
+        done = kills.get(mission.id, 0) + 1
+        kills[mission.id] = done
+        _kills_by_faction[queue_key] = _kills_by_faction.get(queue_key, 0) + 1
+        if done >= mission.count:
+            # The game now sends a MissionRedirected-Event for it. Further Kills go to the next Mission.
+            queue.popleft()
+            if len(queue) == 0:
+                del queues[queue_key]
+    if len(queues) == 0:
+        del _queues[victim_faction]
+    # Kills in quick succession (e.g. while catching up on the Journal) are merged into a single Event
+    scheduler.schedule("kill_progress", __emit_kill_progress)
+
+
+def __emit_kill_progress():
+    progress = get_kill_progress()
+    for listener in kill_progress_listeners:
+        listener(progress)
+
+
+massacre_store_changed_listeners.append(__handle_store_changed)
@@ -0,0 +1,254 @@
+"""
+This Module contains the Totals of all active Massacre Missions (Kills and Rewards per Faction, Stack Height, etc.).
+
+They are updated with every added and removed Mission instead of being computed from all Missions again. Adding or
+removing a Mission costs O(1), apart from keeping the Kill Counts per Faction sorted, which costs O(log Factions).
+
+Missions only stack if they share their Target System, Target Faction and Target Type. Each such Stack is kept
+separately as well, see PartitionedMassacreMissionAggregate.
+"""
+import bisect
+from collections import Counter
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Mapping
+
+if TYPE_CHECKING:
+    from massacre.massacre_mission_state import MassacreMission
+
+
+@dataclass(frozen=True, order=True)
+class StackKey:
+    """
+    Identifies a Stack. Missions only stack if all of these are the same.
+    """
+    target_system: str
+    target_faction: str
+    target_type: str
+
+    @staticmethod
+    def of(mission: "MassacreMission") -> "StackKey":
+        return StackKey(mission.target_system or "", mission.target_faction or "", mission.target_type or "")
+
+
+@dataclass(frozen=True)
+class FactionSummary:
+    """
+    Totals of all Missions of one Faction (the one that handed them out)
+    """
+    allnum: int
+    cmpnum: int
+    killcmpcount: int
+    killcount: int
+    reward: int
+    shareable_reward: int
+
+
+@dataclass(frozen=True)
+class MassacreMissionSummary:
+    """
+    Immutable Totals of all Massacre Missions, see MassacreMissionAggregate.summarize.
+    The fields are the same as in MassacreMissionData (see UI).
+    """
+    factions: Mapping[str, FactionSummary]
+    stack_height: int
+    before_stack_height: int
+    target_sum: int
+    reward: int
+    shareable_reward: int
+    mission_count: int
+    cmpmission_count: int
+    cmpreward: int
+    cmpshareable_reward: int
+    killcmpcount: int
+    target_factions: tuple[str, ...]
+    target_types: tuple[str, ...]
+    target_systems: tuple[str, ...]
+
+
+class _SortedMultiset:
+    """
+    Counts how often each value occurs, and keeps the distinct values sorted
+    """
+
+    def __init__(self):
+        self._counts: Counter[int] = Counter()
+        self._values: list[int] = []
+
+    def add(self, value: int):
+        if self._counts[value] == 0:
+            bisect.insort(self._values, value)
+        self._counts[value] += 1
+
+    def remove(self, value: int):
+        self._counts[value] -= 1
+        if self._counts[value] == 0:
+            del self._counts[value]
+            del self._values[bisect.bisect_left(self._values, value)]
+
+    def largest(self, default: int = 0) -> int:
+        return self._values[-1] if len(self._values) > 0 else default
+
+    def second_largest_distinct(self, default: int = 0) -> int:
+        """The largest value that is smaller than the largest value"""
+        return self._values[-2] if len(self._values) > 1 else default
+
+
+class _FactionCounters:
+    __slots__ = ("allnum", "cmpnum", "killcmpcount", "killcount", "reward", "shareable_reward")
+
+    def __init__(self):
+        self.allnum = 0
+        self.cmpnum = 0
+        self.killcmpcount = 0
+        self.killcount = 0
+        self.reward = 0
+        self.shareable_reward = 0
+
+
+class MassacreMissionAggregate:
+    """
+    The Totals of a set of Massacre Missions. Every Mission has to be removed exactly as it was added, so
+    a Mission that changed has to be removed in its old and added in its new version.
+    """
+
+    def __init__(self):
+        self._factions: dict[str, _FactionCounters] = {}
+        self._kill_counts = _SortedMultiset()
+        """killcount of every Faction"""
+        self._completed_kill_counts = _SortedMultiset()
+        """killcmpcount of every Faction"""
+        self._target_factions: dict[str, int] = {}
+        """Target Faction to the amount of Missions with it"""
+        self._target_types: dict[str, int] = {}
+        self._target_systems: dict[str, int] = {}
+        self.mission_count = 0
+        self.target_sum = 0
+        self.reward = 0
+        self.shareable_reward = 0
+        self.cmpmission_count = 0
+        self.cmpreward = 0
+        self.cmpshareable_reward = 0
+
+    @staticmethod
+    def __add_reference(references: dict[str, int], key: str):
+        references[key] = references.get(key, 0) + 1
+
+    @staticmethod
+    def __remove_reference(references: dict[str, int], key: str):
+        if references[key] == 1:
+            del references[key]
+        else:
+            references[key] -= 1
+
+    def __update(self, mission: "MassacreMission", sign: int):
+        faction = self._factions.get(mission.source_faction)
+        if faction is None:
+            faction = self._factions[mission.source_faction] = _FactionCounters()
+        else:
+            self._kill_counts.remove(faction.killcount)
+            self._completed_kill_counts.remove(faction.killcmpcount)
+
+        wing_reward = mission.reward if mission.is_wing else 0
+        faction.allnum += sign
+        faction.killcount += sign * mission.count
+        faction.reward += sign * mission.reward
+        faction.shareable_reward += sign * wing_reward
+        if mission.is_completed:
+            faction.cmpnum += sign
+            faction.killcmpcount += sign * mission.count
+            self.cmpmission_count += sign
+            self.cmpreward += sign * mission.reward
+            self.cmpshareable_reward += sign * wing_reward
+
+        if faction.allnum == 0:
+            del self._factions[mission.source_faction]
+        else:
+            self._kill_counts.add(faction.killcount)
+            self._completed_kill_counts.add(faction.killcmpcount)
+
+        self.mission_count += sign
+        self.target_sum += sign * mission.count
+        self.reward += sign * mission.reward
+        self.shareable_reward += sign * wing_reward
+
+    def add(self, mission: "MassacreMission"):
+        self.__update(mission, 1)
+        self.__add_reference(self._target_factions, mission.target_faction)
+        self.__add_reference(self._target_types, mission.target_type)
+        self.__add_reference(self._target_systems, mission.target_system)
+
+    def remove(self, mission: "MassacreMission"):
+        self.__update(mission, -1)
+        self.__remove_reference(self._target_factions, mission.target_faction)
+        self.__remove_reference(self._target_types, mission.target_type)
+        self.__remove_reference(self._target_systems, mission.target_system)
+
+    def summarize(self) -> MassacreMissionSummary:
+        """
+        Copy the current Totals. Costs O(Factions).
+        """
+        stack_height = self._kill_counts.largest()
+        # The highest Kill Count below the Stack Height. If there is none, the Stack Height itself.
+        before_stack_height = self._kill_counts.second_largest_distinct()
+        if before_stack_height == 0:
+            before_stack_height = stack_height
+        return MassacreMissionSummary(
+            MappingProxyType({
+                name: FactionSummary(x.allnum, x.cmpnum, x.killcmpcount, x.killcount, x.reward, x.shareable_reward)
+                for name, x in self._factions.items()
+            }),
+            stack_height,
+            before_stack_height,
+            self.target_sum,
+            self.reward,
+            self.shareable_reward,
+            self.mission_count,
+            self.cmpmission_count,
+            self.cmpreward,
+            self.cmpshareable_reward,
+            self._completed_kill_counts.largest(),
+            tuple(self._target_factions),
+            tuple(self._target_types),
+            tuple(self._target_systems),
+        )
+
+
+class PartitionedMassacreMissionAggregate:
+    """
+    The Totals of every Stack (see StackKey). Adding or removing a Mission only touches its own Stack, and only
+    Stacks that changed are summarized again.
+    """
+
+    def __init__(self):
+        self._stacks: dict[StackKey, MassacreMissionAggregate] = {}
+        self._summaries: dict[StackKey, MassacreMissionSummary] = {}
+        """Summary of every Stack that did not change since it was last summarized"""
+
+    def add(self, mission: "MassacreMission"):
+        key = StackKey.of(mission)
+        stack = self._stacks.get(key)
+        if stack is None:
+            stack = self._stacks[key] = MassacreMissionAggregate()
+        stack.add(mission)
+        self._summaries.pop(key, None)
+
+    def remove(self, mission: "MassacreMission"):
+        key = StackKey.of(mission)
+        stack = self._stacks[key]
+        stack.remove(mission)
+        if stack.mission_count == 0:
+            del self._stacks[key]
+        self._summaries.pop(key, None)
+
+    def summarize(self) -> Mapping[StackKey, MassacreMissionSummary]:
+        """
+        Copy the current Totals of every Stack, ordered by StackKey. Costs O(Factions) of the changed Stacks only.
+        """
+        summaries: dict[StackKey, MassacreMissionSummary] = {}
+        for key in sorted(self._stacks.keys()):
+            summary = self._summaries.get(key)
+            if summary is None:
+                summary = self._summaries[key] = self._stacks[key].summarize()
+            summaries[key] = summary
+        return MappingProxyType(summaries)
@@ -1,17 +1,29 @@
 """
 This Module contains a subset of all active missions which only contain Massacre Missions
+
+The current state is published as an immutable Snapshot (see get_snapshot). Snapshots are never modified, so they
+can be passed to and read from any Thread without locking.
 """
-from typing import Callable
+import itertools
+from types import MappingProxyType
+from typing import Callable, Mapping, Optional
 from massacre.logger_factory import logger
 from dataclasses import dataclass
+from massacre.mission_record import MissionRecord
+from massacre.mission_repository import MissionDelta
+from massacre.update_scheduler import scheduler
+from massacre.massacre_mission_aggregate import MassacreMissionAggregate, MassacreMissionSummary, \
+    PartitionedMassacreMissionAggregate, StackKey
 
 import massacre.mission_repository
 
-@dataclass
+@dataclass(frozen=True)
 class MassacreMission:
     """
     Class defining a Massacre Mission.
     This class is used in the UI to generate a data view
+
+    Instances are immutable. If a Mission changes, a new instance replaces it.
     """
     target_faction: str 
     count: int
@@ -22,6 +34,8 @@ class MassacreMission:
     is_wing: bool
     is_completed:bool # 增加完成标识
     id: int
+    expiry: Optional[str] = None
+    """Expiry as found in the Journal, e.g. 2024-01-31T23:59:59Z"""
 
     def as_dict(self):
         as_dict = {
@@ -33,40 +47,122 @@ class MassacreMission:
             "target_system": self.target_system,
             "source_faction": self.source_faction,
             "is_wing": self.is_wing,
-            "is_completed": self.is_completed
+            "is_completed": self.is_completed,
+            "expiry": self.expiry
         }
         return as_dict
 
 
-def __build_from_event(event: dict) -> MassacreMission:
+def __build_from_record(record: MissionRecord) -> MassacreMission:
     """
-    Build a Massacre Mission from a MissionAccepted-Event
+    Build a Massacre Mission from the Record of a MissionAccepted-Event
     """
-    target_faction: str = event["TargetFaction"]
-    count: int = event["KillCount"]
-    reward: int = event["Reward"]
-    target_system: str = event["DestinationSystem"]
-    target_type: str = event["TargetType"]
-    source_faction: str = event["Faction"]
-    mission_id: int = event["MissionID"]
-    wing: bool = event["Wing"]
-    completed: bool = event.get("is_completed", False)  # 获取可能存在的完成标识
     return MassacreMission(
-            target_faction, 
-            count, 
-            reward, 
-            target_system, 
-            target_type, 
-            source_faction, 
-            wing, 
-            completed,
-            mission_id
+            record.target_faction,
+            record.kill_count,
+            record.reward,
+            record.target_system,
+            record.target_type,
+            record.faction,
+            record.is_wing,
+            record.is_completed,
+            record.mission_id,
+            record.expiry
         )
 
 
-massacre_mission_listeners: list[Callable[[dict[int, MassacreMission]], None]] = []
+@dataclass(frozen=True)
+class MassacreMissionSnapshot:
+    """
+    An immutable view on all active Massacre Missions of a CMDR. Can be read from any Thread.
+    """
+    version: int
+    """Increases with every published Snapshot"""
+    cmdr: Optional[str]
+    missions: Mapping[int, MassacreMission]
+    """Read-only Mapping of Mission ID to Mission"""
+    summary: MassacreMissionSummary
+    """Totals of the Missions (Kills and Rewards per Faction, Stack Height, etc.)"""
+    stacks: Mapping[StackKey, MassacreMissionSummary]
+    """Totals of every Stack, i.e. of the Missions sharing their Target System, Target Faction and Target Type"""
+
+
+massacre_mission_listeners: list[Callable[[Mapping[int, MassacreMission]], None]] = []
+"""
+Invoked on the main thread with the Missions of every new Snapshot. The Mapping is read-only.
+"""
+massacre_snapshot_listeners: list[Callable[[MassacreMissionSnapshot], None]] = []
+"""
+Invoked on the main thread with every new Snapshot. The Snapshot may be handed to other Threads.
+"""
+massacre_store_changed_listeners: list[Callable[[Optional[str], Mapping[int, MassacreMission]], None]] = []
+"""
+Invoked right after every Mission Delta was applied, before the Snapshot is published. For anything that has to stay
+in step with the Journal Events (see kill_progress). The Missions may change after the call, so they must not be
+kept. Callback: (cmdr, read-only Missions) -> void
+"""
 
 _massacre_mission_store: dict[int, MassacreMission] = {}
+"""
+The Massacre Missions as modified by the Mission Deltas. Once published as part of a Snapshot it is not modified
+anymore, the next Delta modifies a copy instead (see __get_writable_store).
+"""
+_is_store_published = False
+_cmdr: Optional[str] = None
+
+_aggregate = MassacreMissionAggregate()
+"""
+Totals of the Missions in the Store. Updated together with the Store, see __put_mission and __pop_mission.
+"""
+_stacks = PartitionedMassacreMissionAggregate()
+"""
+Totals of every Stack in the Store. Updated together with the Store.
+"""
+
+_massacre_mission_stores_by_cmdr: dict[str, tuple[dict[int, MassacreMission], MassacreMissionAggregate,
+                                                  PartitionedMassacreMissionAggregate]] = {}
+"""
+The latest Store and its Totals of every CMDR seen so far. Used when the Mission Repository switches back to a CMDR,
+see MissionDelta.restores_cmdr.
+"""
+
+_snapshot = MassacreMissionSnapshot(0, None, MappingProxyType({}), MassacreMissionAggregate().summarize(),
+                                    MappingProxyType({}))
+
+
+def get_snapshot() -> MassacreMissionSnapshot:
+    """
+    Return the latest published Snapshot. Safe to call from any Thread.
+    """
+    return _snapshot
+
+
+def __get_writable_store() -> dict[int, MassacreMission]:
+    """
+    Copy the Store if it is part of a published Snapshot (Copy-on-Write)
+    """
+    global _massacre_mission_store, _is_store_published
+    if _is_store_published:
+        _massacre_mission_store = dict(_massacre_mission_store)
+        _is_store_published = False
+    return _massacre_mission_store
+
+
+def __put_mission(store: dict[int, MassacreMission], mission: MassacreMission):
+    previous = store.get(mission.id)
+    if previous is not None:
+        _aggregate.remove(previous)
+        _stacks.remove(previous)
+    store[mission.id] = mission
+    _aggregate.add(mission)
+    _stacks.add(mission)
+
+
+def __pop_mission(store: dict[int, MassacreMission], uuid: int):
+    previous = store.pop(uuid, None)
+    if previous is not None:
+        _aggregate.remove(previous)
+        _stacks.remove(previous)
 
 
 def __is_mission_a_massacre_mission(name: str, target_type: str) -> bool:
@@ -74,30 +170,76 @@ def __is_mission_a_massacre_mission(name: str, target_type: str) -> bool:
     return name.startswith("Mission_Massacre") and "OnFoot" not in name and target_type
 
 
-def __handle_new_missions_state(data: dict[int, dict]):
+def __handle_missions_delta(delta: MissionDelta, data: dict[int, MissionRecord]):
     """
-    Callback used by the Mission Repository to notify this Module about new Missions. This module
-    will then filter out non-massacre missions.
+    Callback used by the Mission Repository to notify this Module about changed Missions. This module
+    will then filter out non-massacre missions. Only the Missions in the Delta are looked at.
 
-    :param data: All missions for this Commander (not just Massacre Missions)
+    :param data: All active missions for this Commander (not just Massacre Missions)
+    """
+    global _massacre_mission_store, _is_store_published, _cmdr, _aggregate, _stacks
+    _cmdr = delta.cmdr
+    if delta.is_reset and delta.restores_cmdr and delta.cmdr in _massacre_mission_stores_by_cmdr:
+        # Nothing changed for this CMDR since they were last active
+        logger.info(f"Switched back to CMDR {delta.cmdr}.")
+        _massacre_mission_store, _aggregate, _stacks = _massacre_mission_stores_by_cmdr[delta.cmdr]
+        # The Store may be part of an earlier Snapshot
+        _is_store_published = True
+        __notify_store_changed()
+        scheduler.schedule("massacre_missions", __emit_massacre_mission_state)
+        return
+
+    if delta.is_reset:
+        logger.info(f"Received a new Missions State with {len(data)} Missions.")
+        _massacre_mission_store = {}
+        _is_store_published = False
+        _aggregate = MassacreMissionAggregate()
+        _stacks = PartitionedMassacreMissionAggregate()
+    elif len(delta.added) == 0 and len(delta.removed) == 0 and len(delta.changed) == 0:
+        return
+
+    store = __get_writable_store()
+    for uuid in delta.removed:
+        __pop_mission(store, uuid)
+    for uuid in itertools.chain(delta.added, delta.changed):
+        mission = data.get(uuid)
+        if mission is not None and __is_mission_a_massacre_mission(mission.name, mission.target_type):
+            __put_mission(store, __build_from_record(mission))
+        else:
+            __pop_mission(store, uuid)
+
+    if delta.cmdr is not None:
+        _massacre_mission_stores_by_cmdr[delta.cmdr] = (store, _aggregate, _stacks)
+
+    if delta.is_reset:
+        logger.info(f"{len(store)} of found Missions are Massacre Missions")
+
+    __notify_store_changed()
+    # Emit Event. Deltas arriving in a burst are merged into a single Event.
+    scheduler.schedule("massacre_missions", __emit_massacre_mission_state)
+
+
+def __notify_store_changed():
+    missions = MappingProxyType(_massacre_mission_store)
+    for listener in massacre_store_changed_listeners:
+        listener(_cmdr, missions)
+
+
+def __emit_massacre_mission_state():
     """
-    # Go through all Missions, check if they are Massacre Missions
-    logger.info(f"Received a new Missions State with {len(data)} Missions.")
-    relevant_mission_events = []
-    for mission in data.values():
-        if __is_mission_a_massacre_mission(mission["Name"], mission.get('TargetType', None)):
-            relevant_mission_events.append(mission)
-    logger.info(f"{len(relevant_mission_events)} of found Missions are Massacre Missions")
-    relevant_missions = map(__build_from_event, relevant_mission_events)
-
-    # Push new Mission State to the Massacre Mission Store
-    _massacre_mission_store.clear()
-    for mission in relevant_missions:
-        _massacre_mission_store[mission.id] = mission
-
-    # Emit Event
+    Publish the Store as a new Snapshot and pass it to the listeners
+    """
+    global _snapshot, _is_store_published
+    _is_store_published = True
+    # A single assignment, so other Threads either see the previous or the new Snapshot
+    snapshot = MassacreMissionSnapshot(_snapshot.version + 1, _cmdr, MappingProxyType(_massacre_mission_store),
+                                       _aggregate.summarize(), _stacks.summarize())
+    _snapshot = snapshot
+
     for listener in massacre_mission_listeners:
-        listener(_massacre_mission_store)
+        listener(snapshot.missions)
+    for listener in massacre_snapshot_listeners:
+        listener(snapshot)
 
 
-massacre.mission_repository.active_missions_changed_event_listeners.append(__handle_new_missions_state)
+massacre.mission_repository.active_missions_delta_listeners.append(__handle_missions_delta)
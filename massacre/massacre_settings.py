@@ -75,6 +75,32 @@ class Configuration:
     def display_mission_count(self, value: bool):
         config.set(f"{self.plugin_name}.display_mission_count", value)
 
+    #######################################
+    @property
+    def update_delay_ms(self):
+        """
+        How long UI Updates are delayed so Journal Events arriving in a burst are merged. 0 updates once Tk is idle.
+        """
+        return config.get_int(f"{self.plugin_name}.update_delay_ms", default=0)
+
+    @update_delay_ms.setter
+    def update_delay_ms(self, value: int):
+        config.set(f"{self.plugin_name}.update_delay_ms", value)
+
+    #######################################
+    @property
+    def mission_store_budget(self):
+        """
+        How many Missions are kept in memory at most. Missions that are neither active nor recently used are
+        evicted first. 0 for no limit.
+        """
+        from massacre.mission_repository import DEFAULT_STORE_BUDGET
+        return config.get_int(f"{self.plugin_name}.mission_store_budget", default=DEFAULT_STORE_BUDGET)
+
+    @mission_store_budget.setter
+    def mission_store_budget(self, value: int):
+        config.set(f"{self.plugin_name}.mission_store_budget", value)
+
     #######################################
     def __init__(self, plugin_name: str):
        self.plugin_name = plugin_name
@@ -97,6 +123,16 @@ class Configuration:
             self.overlay_ttl = data['overlay_ttl'].get()
         if "display_mission_count" in keys:
             self.display_mission_count = data['display_mission_count'].get()
+        if "update_delay_ms" in keys:
+            try:
+                self.update_delay_ms = max(int(data["update_delay_ms"].get()), 0)
+            except (tk.TclError, ValueError):
+                logger.warning("Invalid UI Update Delay. Keeping the previous value.")
+        if "mission_store_budget" in keys:
+            try:
+                self.mission_store_budget = max(int(data["mission_store_budget"].get()), 0)
+            except (tk.TclError, ValueError):
+                logger.warning("Invalid Mission Store Size. Keeping the previous value.")
 
         for listener in self.config_changed_listeners:
             listener(self)
@@ -141,6 +177,10 @@ def build_settings_ui(root: nb.Notebook) -> tk.Frame:
         tk.IntVar(value=configuration.display_ratio_and_cr_per_kill_row)
     __setting_changes["display_mission_count"] = \
         tk.IntVar(value=configuration.display_mission_count)
+    __setting_changes["update_delay_ms"] = \
+        tk.IntVar(value=configuration.update_delay_ms)
+    __setting_changes["mission_store_budget"] = \
+        tk.IntVar(value=configuration.mission_store_budget)
 
 
     nb.Label(frame, text=_("UI Settings"), pady=10).grid(sticky=tk.W, padx=title_offset)
@@ -156,10 +196,20 @@ def build_settings_ui(root: nb.Notebook) -> tk.Frame:
     ]
     for entry in ui_settings_checkboxes:
         entry.grid(columnspan=2, padx=checkbox_offset, sticky=tk.W)
+    delay_frame = nb.Frame(frame)
+    nb.Label(delay_frame, text=_("UI Update Delay (ms)")).grid(column=0, row=0, sticky=tk.W)
+    nb.Entry(delay_frame, textvariable=__setting_changes["update_delay_ms"], width=6)\
+        .grid(column=1, row=0, sticky=tk.W, padx=checkbox_offset)
+    delay_frame.grid(columnspan=2, padx=checkbox_offset, sticky=tk.W)
  
     nb.Label(frame, text=_("Other"), pady=10, padx=title_offset).grid(sticky=tk.W)
     nb.Checkbutton(frame, text=_("Check for Updates on Start"), variable=__setting_changes["check_updates"])\
         .grid(columnspan=2, sticky=tk.W, padx=checkbox_offset)
+    budget_frame = nb.Frame(frame)
+    nb.Label(budget_frame, text=_("Missions kept in Memory (0 = all)")).grid(column=0, row=0, sticky=tk.W)
+    nb.Entry(budget_frame, textvariable=__setting_changes["mission_store_budget"], width=8)\
+        .grid(column=1, row=0, sticky=tk.W, padx=checkbox_offset)
+    budget_frame.grid(columnspan=2, padx=checkbox_offset, sticky=tk.W)
     nb.Label(frame, text="", pady=10).grid()
     
 
@@ -1,8 +1,12 @@
-import json
+import threading
 import datetime as dt
 from pathlib import Path
+from typing import Callable, Optional
 from config import config
 from massacre.logger_factory import logger
+from massacre.journal_index import CommanderMissionIndex, JournalIndex, parse_journal_file
+from massacre.journal_catalogue import JournalCatalogue, JournalFile
+from massacre.mission_record import MissionRecord
 
 file_location: str
 
@@ -22,74 +26,219 @@ class MissionEventsLog:
         self._cmdr = cmdr
 
 
-def __get_logs_after_timestamp(timestamp: dt.date) -> list[Path]:
-    logs_after_timestamp = []
+journal_catalogue = JournalCatalogue(Path(file_location))
+"""
+Catalogue of all Journal Files, sorted by the Timestamp in their names.
+"""
 
-    for log_file in Path(file_location).glob("*.log"):
-        if not log_file.is_file():
-            continue
-        if timestamp < dt.datetime.fromtimestamp(log_file.stat().st_mtime, tz=dt.timezone.utc).date():
-            logs_after_timestamp.append(log_file)
+
+def __get_logs_after_timestamp(catalogue: JournalCatalogue, timestamp: dt.date) -> list[JournalFile]:
+    catalogue.refresh()
+    logs_after_timestamp = catalogue.select_after(timestamp)
     logger.debug(f"Loaded {len(logs_after_timestamp)} Logs for all CMDRs")
     return logs_after_timestamp
 
 
-# noinspection SpellCheckingInspection
-def get_missions_for_all_cmdrs(timestamp: dt.date) -> dict[str, dict[int, dict]]:
+def build_mission_index(timestamp: dt.date, catalogue: JournalCatalogue = journal_catalogue) -> CommanderMissionIndex:
+    """
+    Bring the persistent Journal Index up to date for all Journals after the provided timestamp and return
+    its Missions-Events grouped by CMDR. Missions are only built once a CMDR is loaded from the returned index.
+
+    :param catalogue: The Journals to read. Defaults to the Journal Directory configured in EDMC.
+    """
+    journals = __get_logs_after_timestamp(catalogue, timestamp)
+    # Journals older than the lookback only keep their Mission IDs in the Index
+    all_journals = catalogue.files
+    retained = all_journals[:len(all_journals) - len(journals)]
+
+    index = JournalIndex.load()
+    index.update(journals, retained)
+    index.save()
+
+    return index.group_by_cmdr(journals, index.build_mission_id_index(all_journals))
+
+
+MAX_MISSION_DURATION = dt.timedelta(weeks=2)
+"""
+Upper bound for the time between accepting a Mission and its Expiry. Used to limit how far back the Journals
+are searched for a Mission.
+"""
+
+
+def resolve_missions(uuids: list[int], cmdr: str, expiries: dict[int, dt.datetime], timestamp: dt.date,
+                     directory: Optional[Path] = None) -> dict[str, dict[int, MissionRecord]]:
     """
-    Returns all Missions that a CMDR accepted after the provided timestamp
+    Returns the MissionAccepted-Events for the provided Mission UUIDs, and nothing else.
+
+    Unlike build_mission_index the Journals are read newest-first, and reading stops as soon as every
+    Mission has been found. A Mission cannot have been accepted before its Expiry minus MAX_MISSION_DURATION, so
+    older Journals are never read, even if a Mission can not be found. Nothing older than the timestamp is read either.
 
-    **NOTE**: These are not all current missions. Look into the "Missions"-Event under "Active" for active missions.
-    Said array only contains mission UUIDs. So it is best to filter for UUIDs that are present in the Dict
-    returned by this function.
+    Mission UUIDs are unique across all CMDRs, so the CMDR of a Journal does not need to be known.
 
-    :return: Dictionary [CMDR Name, Dictionary[Mission ID, Mission Object]]
+    :param expiries: Expiry per Mission UUID. Missing Expiries only limit the search by the timestamp.
+    :param directory: The Journal Directory. Defaults to the one configured in EDMC.
+    :return: Dictionary [CMDR Name, Dictionary[Mission ID, Mission Record]] only containing the provided CMDR
+    """
+    unresolved = set(uuids)
+    found: dict[int, MissionRecord] = {}
+    redirected: set[int] = set()
+
+    # A Catalogue of its own, as the one of the Mission Index may be refreshed by another Thread
+    catalogue = JournalCatalogue(directory if directory is not None else Path(file_location))
+    catalogue.refresh()
+    newer_journal_start = dt.datetime.max
+    read_count = 0
+
+    for journal in reversed(catalogue.select_after(timestamp)):
+        if len(unresolved) == 0:
+            break
+        if all(map(lambda x: x in expiries, unresolved)):
+            earliest_accept = min(map(lambda x: expiries[x], unresolved)) - MAX_MISSION_DURATION
+            if newer_journal_start <= earliest_accept:
+                # Every Journal from here on ended before the earliest possible acceptance
+                break
+
+        segments, _ = parse_journal_file(journal)
+        read_count += 1
+        location = journal.location
+        for _name, events in segments:
+            for event in events:
+                mission_id = event[1]
+                if event[0] == "MissionRedirected":
+                    # Redirects are always newer than the Acceptance, so they are found first
+                    redirected.add(mission_id)
+                elif mission_id in unresolved:
+                    found[mission_id] = MissionRecord.from_list(event[1:], location)
+                    unresolved.discard(mission_id)
+        newer_journal_start = journal.timestamp
+
+    for mission_id in redirected:
+        if mission_id in found:
+            found[mission_id].is_completed = True
+
+    logger.info(f"Resolved {len(found)} of {len(uuids)} Missions by reading {read_count} Logs")
+    if len(unresolved) > 0:
+        logger.warning(f"Could not resolve Missions {sorted(unresolved)}")
+    return {cmdr: found}
+
+
+def resolve_unknown_missions(mission_index: CommanderMissionIndex, uuids: list[int],
+                             cmdr: str) -> dict[str, dict[int, MissionRecord]]:
     """
+    Returns the MissionAccepted-Events for Missions that are not part of the Missions loaded for a CMDR, e.g.
+    because they were accepted before the lookback.
 
-    current_name: str = ""
-    current_dict: dict[int, dict] = {}
-    return_map: dict[str, dict[int, dict]] = {}
+    The Mission IDs kept per Journal in the Journal Index are used to find the Journal containing each Mission.
+    Only those Journals are read.
+
+    :return: Dictionary [CMDR Name, Dictionary[Mission ID, Mission Record]] only containing the provided CMDR
+    """
+    wanted_by_location: dict[str, tuple[JournalFile, set[int]]] = {}
+    for uuid in uuids:
+        journal = mission_index.locate(uuid)
+        if journal is None:
+            continue
+        wanted_by_location.setdefault(journal.location, (journal, set()))[1].add(uuid)
 
-    for path in __get_logs_after_timestamp(timestamp):
-        logger.debug(f"Opening file {path} ...")
+    found: dict[int, MissionRecord] = {}
+    redirected: set[int] = set()
+    for location, (journal, wanted) in wanted_by_location.items():
+        segments, _ = parse_journal_file(journal)
+        for _name, events in segments:
+            for event in events:
+                if event[0] == "MissionRedirected":
+                    redirected.add(event[1])
+                elif event[1] in wanted:
+                    found[event[1]] = MissionRecord.from_list(event[1:], location)
 
-        with open(path, "r", encoding="utf8") as current_log_file:
-            line = current_log_file.readline()
+    for mission_id, mission in found.items():
+        if mission_id in redirected or mission_index.is_redirected(mission_id):
+            mission.is_completed = True
 
-            while line != "":
-                try:
-                    line_as_json = json.loads(line)
+    logger.info(f"Resolved {len(found)} of {len(uuids)} unknown Missions by reading {len(wanted_by_location)} Logs")
+    return {cmdr: found}
 
-                    if line_as_json["event"] == "Commander":
-                        if current_name != "" and current_dict is not {}:
-                            return_map[current_name] = current_dict
 
-                        name = str(line_as_json["Name"])
+def __worker(timestamp: dt.date, catalogue: JournalCatalogue, cb: Callable[[CommanderMissionIndex], None]):
+    """
+    Function invoked by the new Thread used to build the Mission Index.
+    If building fails, an empty Index is passed so the Plugin does not wait forever.
+    """
+    mission_index = CommanderMissionIndex({})
+    try:
+        mission_index = build_mission_index(timestamp, catalogue)
+    except Exception as e:
+        logger.exception(e)
+    cb(mission_index)
 
-                        if current_name != name:
-                            current_name = name
-                            current_dict = {}
 
-                    if current_name != "":
-                        if line_as_json["event"] == "MissionAccepted":
-                            current_dict[line_as_json["MissionID"]] = line_as_json
-                        elif line_as_json["event"] == "MissionRedirected":
-                            mission_id = line_as_json["MissionID"]
-                            """
-                            此处是处理日志文件中
-                            的MissionRedirected的json固定格式为"event":"MissionRedirected", "MissionID":[唯一任务id], "Name":"Mission_Massacre", "LocalisedName":"[派系名称]", "NewDestinationStation":"[新目标站点名称]", "NewDestinationSystem":"[新目标星系名称]", "OldDestinationStation":"", "OldDestinationSystem":"[旧目标星系名称]"
-                            针对屠杀任务基本上固定返回格式,只需检测MissionID是否在原先的任务列表中即可将其视为完成.
-                            """
-                            if mission_id in current_dict:
-                                # 任务目标完成
-                                #logger.info("has_completed?: %s",current_dict[mission_id])
-                                current_dict[mission_id]["is_completed"] = True # 标识已完成
-                except Exception:
-                    logger.warning("An error occurred, skipping line.")
-                finally:
-                    line = current_log_file.readline()
+def build_worker(timestamp: dt.date, cb: Callable[[CommanderMissionIndex], None],
+                 directory: Optional[Path] = None) -> threading.Thread:
+    """
+    Creates a new Thread used to build the Mission Index. Does not start the thread.
+    The callback is invoked from that Thread.
 
-    if current_name != "" and current_dict is not {}:
-        return_map[current_name] = current_dict
+    :param directory: The Journal Directory. Defaults to the one configured in EDMC.
+    """
+    catalogue = JournalCatalogue(directory) if directory is not None else journal_catalogue
+    thread = threading.Thread(target=__worker, args=[timestamp, catalogue, cb])
+    thread.name = "Massacre Mission Index"
+    thread.daemon = True
+
+    return thread
+
+
+def __resolve_worker(uuids: list[int], cmdr: str, expiries: dict[int, dt.datetime], timestamp: dt.date,
+                     directory: Optional[Path], cb: Callable[[dict[str, dict[int, MissionRecord]]], None]):
+    """
+    Function invoked by the new Thread used to resolve Missions.
+    """
+    try:
+        missions = resolve_missions(uuids, cmdr, expiries, timestamp, directory)
+    except Exception as e:
+        logger.exception(e)
+        return
+    cb(missions)
+
+
+def build_resolve_worker(uuids: list[int], cmdr: str, expiries: dict[int, dt.datetime], timestamp: dt.date,
+                         cb: Callable[[dict[str, dict[int, MissionRecord]]], None],
+                         directory: Optional[Path] = None) -> threading.Thread:
+    """
+    Creates a new Thread used to resolve the provided Missions (see resolve_missions). Does not start the thread.
+    The callback is invoked from that Thread.
+
+    :param directory: The Journal Directory. Defaults to the one configured in EDMC.
+    """
+    thread = threading.Thread(target=__resolve_worker, args=[uuids, cmdr, expiries, timestamp, directory, cb])
+    thread.name = "Massacre Mission Resolver"
+    thread.daemon = True
+
+    return thread
+
+
+def __resolve_unknown_worker(mission_index: CommanderMissionIndex, uuids: list[int], cmdr: str,
+                             cb: Callable[[dict[str, dict[int, MissionRecord]]], None]):
+    """
+    Function invoked by the new Thread used to resolve unknown Missions.
+    """
+    try:
+        missions = resolve_unknown_missions(mission_index, uuids, cmdr)
+    except Exception as e:
+        logger.exception(e)
+        return
+    cb(missions)
+
+
+def build_resolve_unknown_worker(mission_index: CommanderMissionIndex, uuids: list[int], cmdr: str,
+                                 cb: Callable[[dict[str, dict[int, MissionRecord]]], None]) -> threading.Thread:
+    """
+    Creates a new Thread used to resolve unknown Missions (see resolve_unknown_missions). Does not start the thread.
+    The callback is invoked from that Thread.
+    """
+    thread = threading.Thread(target=__resolve_unknown_worker, args=[mission_index, uuids, cmdr, cb])
+    thread.name = "Massacre Unknown Mission Resolver"
+    thread.daemon = True
 
-    return return_map
+    return thread
@@ -0,0 +1,239 @@
+"""
+This Module removes active Missions once their Expiry has passed.
+
+The game only reports expired Missions with the next Missions-Event, so without this they would stay in the stack
+until the game is reloaded. The Expiries of all active Missions are kept in a hashed Timer Wheel (with a Heap for
+Expiries beyond its last slot), and a single Timer is armed for the next Expiry. Nothing is polled.
+"""
+import heapq
+import time
+import datetime as dt
+from typing import Any, Callable, Optional
+
+import massacre.mission_repository
+from massacre.mission_repository import MissionDelta
+from massacre.mission_record import MissionRecord
+
+_MAX_TIMER_DELAY = 3600.0
+"""
+Seconds the Timer is armed for at most. Longer delays are split up, so a PC that was suspended does not expire
+Missions late.
+"""
+
+
+class ExpiryWheel:
+    """
+    A hashed Timer Wheel. Each Mission is put into the slot of the tick its Expiry falls into, so adding and
+    cancelling a Mission is O(1). Finding the next Expiry only looks at the slots up to it.
+
+    Missions last days, far longer than one rotation of the Wheel. Expiries beyond the last slot are kept in a Heap
+    instead, so they never share a slot with earlier ones and finding the next Expiry never has to look at all of them.
+    """
+
+    def __init__(self, tick_seconds: float = 60.0, slot_count: int = 512):
+        self._tick_seconds = tick_seconds
+        self._slots: list[dict[int, float]] = [{} for _ in range(slot_count)]
+        """Mission UUID to Expiry (as Unix Timestamp) for every slot"""
+        self._slot_by_uuid: dict[int, int] = {}
+        self._far_expiries: dict[int, float] = {}
+        """Mission UUID to Expiry for every Mission in _far_heap"""
+        self._far_heap: list[tuple[float, int]] = []
+        """
+        (Expiry, Mission UUID) of the Missions beyond the last slot. Cancelled Missions are only removed once they
+        reach the top, see __peek_far.
+        """
+        self._cursor = self.__tick(time.time())
+        """All Expiries before this tick have been popped. Expiries added later that are older are put here."""
+
+    def __len__(self):
+        return len(self._slot_by_uuid) + len(self._far_expiries)
+
+    def __tick(self, timestamp: float) -> int:
+        return int(timestamp // self._tick_seconds)
+
+    def add(self, uuid: int, expiry: float):
+        self.cancel(uuid)
+        tick = max(self.__tick(expiry), self._cursor)
+        if tick >= self._cursor + len(self._slots):
+            self._far_expiries[uuid] = expiry
+            heapq.heappush(self._far_heap, (expiry, uuid))
+            return
+        slot = tick % len(self._slots)
+        self._slots[slot][uuid] = expiry
+        self._slot_by_uuid[uuid] = slot
+
+    def cancel(self, uuid: int):
+        slot = self._slot_by_uuid.pop(uuid, None)
+        if slot is not None:
+            del self._slots[slot][uuid]
+        elif self._far_expiries.pop(uuid, None) is not None and len(self._far_heap) > 2 * len(self._far_expiries) + 64:
+            # Drop the cancelled entries, so Missions that change often do not grow the Heap
+            self._far_heap = [(expiry, x) for x, expiry in self._far_expiries.items()]
+            heapq.heapify(self._far_heap)
+
+    def clear(self):
+        for slot in self._slot_by_uuid.values():
+            self._slots[slot].clear()
+        self._slot_by_uuid.clear()
+        self._far_expiries.clear()
+        self._far_heap.clear()
+
+    def __peek_far(self) -> Optional[float]:
+        """
+        Return the earliest Expiry beyond the last slot, or None if there is none
+        """
+        while len(self._far_heap) > 0:
+            expiry, uuid = self._far_heap[0]
+            if self._far_expiries.get(uuid) == expiry:
+                return expiry
+            heapq.heappop(self._far_heap)
+        return None
+
+    def __next_in_slots(self) -> Optional[float]:
+        if len(self._slot_by_uuid) == 0:
+            return None
+        slot_count = len(self._slots)
+        for tick in range(self._cursor, self._cursor + slot_count):
+            entries = self._slots[tick % slot_count]
+            if len(entries) > 0:
+                # Every slot only holds a single tick, as later ones go to the Heap
+                return min(entries.values())
+        return None
+
+    def next_expiry(self) -> Optional[float]:
+        """
+        Return the earliest Expiry, or None if the Wheel is empty
+        """
+        # The cursor moved on since the Heap entries were added, so they may be earlier than the last slots
+        candidates = [x for x in (self.__next_in_slots(), self.__peek_far()) if x is not None]
+        return min(candidates) if len(candidates) > 0 else None
+
+    def pop_expired(self, now: float) -> list[int]:
+        """
+        Remove and return all Missions whose Expiry has passed
+        """
+        expired: list[int] = []
+        next_expiry = self.__peek_far()
+        while next_expiry is not None and next_expiry <= now:
+            _expiry, uuid = heapq.heappop(self._far_heap)
+            del self._far_expiries[uuid]
+            expired.append(uuid)
+            next_expiry = self.__peek_far()
+
+        next_expiry = self.__next_in_slots()
+        while next_expiry is not None and next_expiry <= now:
+            slot = max(self.__tick(next_expiry), self._cursor) % len(self._slots)
+            for uuid, expiry in list(self._slots[slot].items()):
+                if expiry <= now:
+                    expired.append(uuid)
+                    self.cancel(uuid)
+            next_expiry = self.__next_in_slots()
+        self._cursor = max(self._cursor, self.__tick(now))
+        return expired
+
+
+def parse_expiry(expiry: Optional[str]) -> Optional[float]:
+    """
+    Convert an Expiry as found in the Journal (e.g. 2024-01-31T23:59:59Z) to a Unix Timestamp
+    """
+    if expiry is None:
+        return None
+    try:
+        return dt.datetime.strptime(expiry, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=dt.timezone.utc).timestamp()
+    except ValueError:
+        return None
+
+
+_wheel = ExpiryWheel()
+
+_timer: Optional[tuple[Callable[[int, Callable[[], None]], Any], Callable[[Any], None]]] = None
+"""
+Functions arming and cancelling a Timer, see set_timer
+"""
+_armed_timer: Any = None
+_armed_for: Optional[float] = None
+"""The Expiry the Timer is armed for"""
+
+
+def set_timer(arm: Callable[[int, Callable[[], None]], Any], cancel: Callable[[Any], None]):
+    """
+    Set the Functions used to arm and cancel the Timer, e.g. Tk's after and after_cancel (see build_tk_timer).
+    Until this is called Missions only expire by calling expire_due_missions.
+    """
+    global _timer
+    __disarm()
+    _timer = (arm, cancel)
+    __arm()
+
+
+def build_tk_timer(widget) -> tuple[Callable[[int, Callable[[], None]], Any], Callable[[Any], None]]:
+    return widget.after, widget.after_cancel
+
+
+def __disarm():
+    global _armed_timer, _armed_for
+    if _timer is not None and _armed_timer is not None:
+        _timer[1](_armed_timer)
+    _armed_timer = None
+    _armed_for = None
+
+
+def __arm():
+    """
+    Arm the Timer for the next Expiry, unless it is armed for it already
+    """
+    global _armed_timer, _armed_for
+    if _timer is None:
+        return
+    now = time.time()
+    next_expiry = _wheel.next_expiry()
+    if next_expiry == _armed_for and _armed_timer is not None:
+        return
+    __disarm()
+    if next_expiry is None:
+        return
+    delay = min(max(next_expiry - now, 0.0), _MAX_TIMER_DELAY)
+    _armed_for = next_expiry
+    _armed_timer = _timer[0](int(delay * 1000) + 1, __on_timer)
+
+
+def __on_timer():
+    global _armed_timer, _armed_for
+    _armed_timer = None
+    _armed_for = None
+    expire_due_missions()
+    __arm()
+
+
+def expire_due_missions():
+    """
+    Remove all active Missions whose Expiry has passed from the Mission Repository. Cheap if there are none.
+    """
+    expired = _wheel.pop_expired(time.time())
+    if len(expired) == 0:
+        return
+    repository = massacre.mission_repository.mission_repository
+    if repository is not None:
+        repository.notify_about_missions_expired(expired)
+
+
+def __handle_missions_delta(delta: MissionDelta, data: dict[int, MissionRecord]):
+    """
+    Keep the Wheel in sync with the active Missions. Only the Missions in the Delta are looked at.
+    """
+    if delta.is_reset:
+        _wheel.clear()
+    else:
+        for uuid in delta.removed:
+            _wheel.cancel(uuid)
+    for uuid in (data.keys() if delta.is_reset else delta.added | delta.changed):
+        mission = data.get(uuid)
+        expiry = parse_expiry(mission.expiry) if mission is not None else None
+        if expiry is not None:
+            _wheel.add(uuid, expiry)
+        else:
+            _wheel.cancel(uuid)
+    __arm()
+
+
+massacre.mission_repository.active_missions_delta_listeners.append(__handle_missions_delta)
@@ -0,0 +1,107 @@
+"""
+This Module contains the compact Representation of a MissionAccepted-Event used by the Mission Repository.
+"""
+import sys
+from typing import Any, Optional, Union
+
+from massacre import json_decoder
+from massacre.journal_catalogue import open_journal_location
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    """
+    Faction-, System- and Mission-Names repeat across many Missions. Interning them keeps one copy of each.
+    """
+    return sys.intern(value) if value is not None else None
+
+
+class MissionRecord:
+    """
+    A MissionAccepted-Event reduced to the fields the Plugin uses.
+
+    The full event is not kept. If it is needed (e.g. by an Integration) it can be read again with raw_event.
+    """
+    __slots__ = ("mission_id", "name", "faction", "target_faction", "target_type", "target_system",
+                 "kill_count", "reward", "is_wing", "expiry", "is_completed", "_source")
+
+    def __init__(self, mission_id: int, name: str, faction: Optional[str], target_faction: Optional[str],
+                 target_type: Optional[str], target_system: Optional[str], kill_count: int, reward: int,
+                 is_wing: bool, expiry: Optional[str], source: Union[tuple[str, int], dict, None] = None,
+                 is_completed: bool = False):
+        self.mission_id = mission_id
+        self.name = _intern(name)
+        self.faction = _intern(faction)
+        """The Faction that handed out the Mission"""
+        self.target_faction = _intern(target_faction)
+        self.target_type = _intern(target_type)
+        self.target_system = _intern(target_system)
+        self.kill_count = kill_count
+        self.reward = reward
+        self.is_wing = is_wing
+        self.expiry = expiry
+        """Expiry as found in the Journal, e.g. 2024-01-31T23:59:59Z"""
+        self.is_completed = is_completed
+        """Set once a MissionRedirected-Event was found for this Mission. 任务目标完成"""
+        self._source = source
+        """
+        Where the raw event can be found again. Either (Journal Location, Byte Offset of the line), or the raw
+        event itself for Missions that were passed by EDMC while running.
+        """
+
+    @staticmethod
+    def from_event(event: dict[str, Any], source: Union[tuple[str, int], dict, None] = None) -> "MissionRecord":
+        """
+        Build a Mission Record from a MissionAccepted-Event. If no source is passed, the event itself is kept.
+        """
+        return MissionRecord(
+            event["MissionID"],
+            event["Name"],
+            event.get("Faction"),
+            event.get("TargetFaction"),
+            event.get("TargetType"),
+            event.get("DestinationSystem"),
+            event.get("KillCount", 0),
+            event.get("Reward", 0),
+            event.get("Wing", False),
+            event.get("Expiry"),
+            source if source is not None else event,
+            event.get("is_completed", False)
+        )
+
+    def as_list(self) -> list:
+        """
+        Serialize this Record for the Journal Index. The Journal Path is not part of it, see from_list.
+        """
+        offset = self._source[1] if isinstance(self._source, tuple) else None
+        return [self.mission_id, self.name, self.faction, self.target_faction, self.target_type, self.target_system,
+                self.kill_count, self.reward, self.is_wing, self.expiry, offset]
+
+    @staticmethod
+    def from_list(data: list, location: str) -> "MissionRecord":
+        """
+        Build a Mission Record from the output of as_list. The location is the Journal the Record was read from.
+        """
+        source = (location, data[10]) if data[10] is not None else None
+        return MissionRecord(*data[:10], source=source)
+
+    def raw_event(self) -> Optional[dict[str, Any]]:
+        """
+        Return the full MissionAccepted-Event. This reads the line from the Journal File again (decompressing it
+        if the Journal has been archived).
+
+        :return: The Event, or None if the Journal File is no longer available
+        """
+        if isinstance(self._source, dict):
+            return self._source
+        if self._source is None:
+            return None
+        location, offset = self._source
+        try:
+            with open_journal_location(location) as log_file:
+                log_file.seek(offset)
+                return json_decoder.loads(log_file.readline())
+        except Exception:
+            return None
+
+    def __repr__(self):
+        return f"MissionRecord({self.mission_id}, {self.name}, {self.faction}, completed={self.is_completed})"
@@ -1,14 +1,66 @@
+import itertools
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
 from enum import Flag
-from typing import Callable, Optional
+from typing import Any, Callable, Iterable, Optional
 from massacre.logger_factory import logger
+from massacre.mission_record import MissionRecord
 
-# The listeners are stored as a Tuple of Activator and Callback.
-# Callback: (mission as dict<mission_uuid, mission>) -> void
-active_missions_changed_event_listeners: list[Callable[[dict[int, dict]], None]] = []
-all_missions_changed_event_listeners: list[Callable[[dict[int, dict]], None]] = []
 
-_active_uuids_init = False
-_active_uuids: list[int] = []
+@dataclass(frozen=True)
+class MissionDelta:
+    """
+    Describes how the active Missions changed. Listeners can look up the Records of added and changed Missions in the
+    active Missions passed alongside.
+    """
+    version: int
+    """Increases with every Delta, also across Repositories"""
+    cmdr: Optional[str]
+    added: frozenset[int]
+    removed: frozenset[int]
+    changed: frozenset[int]
+    """Missions that are still active, but whose Record was modified (e.g. completed) or replaced"""
+    is_reset: bool = False
+    """
+    Set if the active Missions were replaced as a whole, e.g. because the CMDR was switched. added then contains
+    all active Missions and removed all previously active ones.
+    """
+    restores_cmdr: bool = False
+    """
+    Set on a reset if the CMDR was active before and their active Missions are exactly as they were back then.
+    Consumers that keep state per CMDR can switch back to it instead of rebuilding it.
+    """
+
+
+# Callback: (delta, active missions as dict<mission_uuid, mission record>) -> void
+# The dict is the live state of the Repository. It must not be modified or kept.
+active_missions_delta_listeners: list[Callable[[MissionDelta, dict[int, MissionRecord]], None]] = []
+# Full-dict listeners, invoked after the delta listeners. They get all active missions on every change.
+# Callback: (mission as dict<mission_uuid, mission record>) -> void
+active_missions_changed_event_listeners: list[Callable[[dict[int, MissionRecord]], None]] = []
+# Invoked with all missions of the current CMDR when a mission is added to the Store or modified
+all_missions_changed_event_listeners: list[Callable[[dict[int, MissionRecord]], None]] = []
+# Callback: (unknown mission uuids, cmdr) -> void. Invoked for active missions that are not in the Mission Store.
+# The listener is expected to look them up and pass them back via set_pending_mission_data.
+unknown_missions_event_listeners: list[Callable[[list[int], str], None]] = []
+
+_active_cmdr: Optional[str] = None
+"""The CMDR of the latest Missions-Event. None until the first one was received."""
+_active_uuids: dict[str, list[int]] = {}
+"""
+The active Mission UUIDs of each CMDR, as of the latest Missions-Event and all Missions accepted and gone since.
+Includes Missions that are not in the Mission Store yet. Used to rebuild the active Missions once more Mission Data
+arrives, so it must always be up to date.
+"""
+
+_delta_versions = itertools.count(1)
+
+DEFAULT_STORE_BUDGET = 5000
+"""
+How many Missions the Mission Store keeps by default. A Mission Record takes roughly 200 Bytes, so this is about 1 MB.
+"""
+_store_budget = DEFAULT_STORE_BUDGET
 
 
 class MissionRepoState(Flag):
@@ -36,7 +88,7 @@ class MissionRepository:
     def active_missions(self):
         return self._active_missions
 
-    def __init__(self, mission_store: dict[str, dict[int, dict]], cmdr: Optional[str] = None):
+    def __init__(self, mission_store: Optional[dict[str, dict[int, MissionRecord]]] = None, cmdr: Optional[str] = None):
         self._cmdr = cmdr
         self._state = MissionRepoState.AWAITING_INIT
         """
@@ -44,24 +96,165 @@ class MissionRepository:
         the Missions-Event (for specific CMDR) are passed.
         """
 
-        self._mission_store: dict[str, dict[int, dict]] = mission_store
+        self._mission_store: dict[str, dict[int, MissionRecord]] = {}
         """
         The Mission Store contains all missions - REGARDLESS OF IF THEY ARE ACTIVE OR NOT
         
-        Note that this contains Data for all Commanders.  
+        Note that this contains Data for all Commanders that have been used so far, see __get_cmdr_missions.
         The first key is the CMDR, the second key is the Mission UUID
         """
-        self._state |= MissionRepoState.HAS_MISSION_DATA
+
+        self._mission_loader: Optional[Callable[[str], dict[int, MissionRecord]]] = None
+        """
+        Loads the historic Missions of a CMDR that is not in the Mission Store yet.
+        """
+
+        self._buffered_events: list[tuple[Callable[..., None], tuple[Any, ...]]] = []
+        """
+        The Mission Data is aggregated in another thread. Events that arrive before it is done are stored here
+        as (Handler, Arguments) and replayed on top of the Mission Data once it is passed.
+        """
+
+        self._active_missions: dict[int, MissionRecord] = {}
+        """Active Missions are just for the current commander. This is the entry of _active_missions_by_cmdr."""
+
+        self._active_missions_by_cmdr: dict[str, dict[int, MissionRecord]] = {}
+        """
+        Active Missions of every CMDR seen so far. Switching back to a CMDR swaps _active_missions for their entry
+        instead of looking up their Missions again.
+        """
+
+        self._requested_uuids: set[int] = set()
+        """Unknown Mission UUIDs that have already been passed to the unknown_missions_event_listeners"""
+
+        self._store_budget = _store_budget
+        """Maximum amount of Missions in the Mission Store, see __evict_missions. 0 for no limit."""
+
+        self._recently_used: OrderedDict[int, str] = OrderedDict()
+        """
+        Every Mission UUID in the Mission Store and its CMDR, least recently used first
+        """
+
+        if mission_store is not None:
+            self.notify_about_mission_data(mission_store)
+
+        if _active_cmdr is not None:
+            self.notify_about_active_mission_uuids(_active_uuids[_active_cmdr], _active_cmdr)
+
+    def __has_mission_data(self) -> bool:
+        return self._state & MissionRepoState.HAS_MISSION_DATA == MissionRepoState.HAS_MISSION_DATA
+
+    def __get_cmdr_missions(self, cmdr: str) -> dict[int, MissionRecord]:
         """
-        Preparations for when and if the Mission Aggregation happens in another thread
+        Return the Mission Store of a CMDR. It is loaded using the Mission Loader the first time a CMDR is requested.
         """
+        cmdr_missions = self._mission_store.get(cmdr)
+        if cmdr_missions is None:
+            cmdr_missions = self._mission_loader(cmdr) if self._mission_loader is not None else {}
+            self._mission_store[cmdr] = cmdr_missions
+            # Historic Missions are the first to be evicted
+            for uuid in cmdr_missions:
+                self._recently_used[uuid] = cmdr
+                self._recently_used.move_to_end(uuid, last=False)
+        return cmdr_missions
 
-        self._active_missions: dict[int, dict] = {}
-        """Active Missions are just for the current commander"""
+    def __add_to_store(self, cmdr: str, cmdr_missions: dict[int, MissionRecord], missions: dict[int, MissionRecord]):
+        """
+        Add Missions unless they are known already. Missions that are known are kept, as events may have
+        changed them since.
+        """
+        for uuid, mission in missions.items():
+            if uuid not in cmdr_missions:
+                cmdr_missions[uuid] = mission
+                self._recently_used[uuid] = cmdr
+
+    def __touch(self, cmdr: str, uuid: int):
+        """
+        Mark a Mission as used, so it is evicted last
+        """
+        if uuid in self._recently_used:
+            self._recently_used.move_to_end(uuid)
+        else:
+            self._recently_used[uuid] = cmdr
+
+    def __evict_missions(self):
+        """
+        Remove the least recently used Missions once the Mission Store exceeds its budget. Missions that are active
+        for any CMDR are kept. A tenth of the budget is freed at once, so this does not run for every new Mission.
 
-        global _active_uuids, _active_uuids_init
-        if _active_uuids_init:
-            self.notify_about_active_mission_uuids(_active_uuids, cmdr)
+        Evicted Missions are requested again via unknown_missions_event_listeners if they become active again.
+        A CMDR without any Missions left is loaded again by the Mission Loader when they are needed.
+        """
+        if self._store_budget <= 0 or len(self._recently_used) <= self._store_budget:
+            return
+        excess = len(self._recently_used) - (self._store_budget - self._store_budget // 10)
+        evicted: list[tuple[int, str]] = []
+        for uuid, cmdr in self._recently_used.items():
+            if len(evicted) >= excess:
+                break
+            active_missions = self._active_missions_by_cmdr.get(cmdr)
+            if active_missions is None or uuid not in active_missions:
+                evicted.append((uuid, cmdr))
+
+        for uuid, cmdr in evicted:
+            del self._recently_used[uuid]
+            self._requested_uuids.discard(uuid)
+            cmdr_missions = self._mission_store.get(cmdr)
+            if cmdr_missions is None:
+                continue
+            cmdr_missions.pop(uuid, None)
+            if len(cmdr_missions) == 0 and cmdr != self._cmdr:
+                del self._mission_store[cmdr]
+        logger.info(f"Evicted {len(evicted)} Missions from the Mission Store. {len(self._recently_used)} are kept.")
+
+    def set_store_budget(self, budget: int):
+        self._store_budget = budget
+        self.__evict_missions()
+
+    def notify_about_mission_data(self, mission_store: dict[str, dict[int, MissionRecord]]):
+        """
+        Pass aggregated historic Mission Data (see Mission Aggregation Helper).
+        Any event that arrived in the meantime is replayed afterwards.
+
+        This can be called more than once, e.g. with a few early resolved Missions first and the full Index later.
+        Missions that are already known are kept, as events may have changed them since.
+        """
+        for cmdr, missions in mission_store.items():
+            self.__add_to_store(cmdr, self.__get_cmdr_missions(cmdr), missions)
+        self.__on_mission_data_added()
+        self.__evict_missions()
+
+    def notify_about_mission_loader(self, mission_loader: Callable[[str], dict[int, MissionRecord]]):
+        """
+        Pass a Mission Loader, which returns the historic Missions of a CMDR (see CommanderMissionIndex.load).
+        CMDRs are only loaded once they are needed, so other CMDRs of the same player cost nothing.
+        """
+        self._mission_loader = mission_loader
+        # The new Loader might know Missions that could not be found before
+        self._requested_uuids.clear()
+        for cmdr, known_missions in self._mission_store.items():
+            self.__add_to_store(cmdr, known_missions, mission_loader(cmdr))
+        self.__on_mission_data_added()
+        self.__evict_missions()
+
+    def __on_mission_data_added(self):
+        for cmdr, active_missions in list(self._active_missions_by_cmdr.items()):
+            if cmdr != self._cmdr and len(active_missions) < len(_active_uuids.get(cmdr, ())):
+                # Some of their Missions could not be found before. They are looked up again once the CMDR is back.
+                del self._active_missions_by_cmdr[cmdr]
+        if self.__has_mission_data():
+            if self._cmdr is not None and self._state & MissionRepoState.HAS_MISSIONS_EVENT:
+                self.notify_about_active_mission_uuids(_active_uuids.get(self._cmdr, []), self._cmdr)
+            return
+
+        self._state |= MissionRepoState.HAS_MISSION_DATA
+
+        buffered_events = self._buffered_events
+        self._buffered_events = []
+        if len(buffered_events) > 0:
+            logger.info(f"Replaying {len(buffered_events)} events received while the Mission Index was built")
+        for handler, args in buffered_events:
+            handler(*args)
 
     def notify_about_active_mission_uuids(self, uuids: list[int], cmdr: str):
         """
@@ -69,78 +262,253 @@ class MissionRepository:
         It should only contain active missions.
         active missions define the intersection between the provided uuids and all missions
         """
-        self._cmdr = cmdr
-
         if cmdr is None:
             logger.error("Passed CMDR is None! Aborting")
             return
 
-        if self._state & MissionRepoState.HAS_MISSIONS_EVENT == 0:
-            self._state |= MissionRepoState.HAS_MISSIONS_EVENT
-        else:
-            #logger.warning("Mission UUIDs were passed even though the State is already initialized. CMDR: "+cmdr+"  UUIDs: %s", repr(uuids))
-            pass
+        if not self.__has_mission_data():
+            self._buffered_events.append((self.notify_about_active_mission_uuids, (list(uuids), cmdr)))
+            return
 
-        self._active_missions = {}
+        previous_cmdr = self._cmdr if self._state & MissionRepoState.HAS_MISSIONS_EVENT else None
+        self._state |= MissionRepoState.HAS_MISSIONS_EVENT
 
-        all_known_uuids = list(self._mission_store[cmdr].keys())
-        for uuid in uuids:
-            if uuid in all_known_uuids:
-                self._active_missions[uuid] = self._mission_store[cmdr][uuid]
-            else:
-                #logger.warning("A Mission could not be found in the Store even though the UUID is present. UUID: %s  all_known_uuids: %s", uuid, all_known_uuids)
-                pass
+        if previous_cmdr != cmdr:
+            self.__switch_cmdr(cmdr)
+
+        previous_active = self._active_missions
+        if previous_active.keys() == set(uuids):
+            # Nothing changed, e.g. a repeated Missions-Event. Happens every time the game is reloaded.
+            for uuid in previous_active:
+                self.__touch(cmdr, uuid)
+            self.__emit()
+            return
+
+        active_missions = self.__look_up_active_missions(uuids, cmdr)
+        self._active_missions = active_missions
+        self._active_missions_by_cmdr[cmdr] = active_missions
 
         #  Emit an Event notifying that the pool of active missions has changed
         #  The listeners should be CMDR-agnostic. They just get the active mission list.
-        for listener in active_missions_changed_event_listeners:
-            listener(self._active_missions)
+        self.__emit(
+            added=active_missions.keys() - previous_active.keys(),
+            removed=previous_active.keys() - active_missions.keys(),
+            changed=[uuid for uuid, mission in active_missions.items()
+                     if uuid in previous_active and previous_active[uuid] is not mission]
+        )
+        self.__evict_missions()
+
+    def __look_up_active_missions(self, uuids: Iterable[int], cmdr: str) -> dict[int, MissionRecord]:
+        """
+        Return the Missions of the CMDR with the given UUIDs. Missions that are not in the Mission Store are requested
+        via unknown_missions_event_listeners, unless they have been requested already.
+        """
+        cmdr_missions = self.__get_cmdr_missions(cmdr)
+        active_missions: dict[int, MissionRecord] = {}
+        unknown_uuids: list[int] = []
+        for uuid in uuids:
+            mission = cmdr_missions.get(uuid)
+            if mission is not None:
+                active_missions[uuid] = mission
+                self.__touch(cmdr, uuid)
+            elif uuid not in self._requested_uuids:
+                unknown_uuids.append(uuid)
+
+        if len(unknown_uuids) > 0:
+            logger.info(f"Missions {unknown_uuids} could not be found in the Store. Requesting them.")
+            self._requested_uuids.update(unknown_uuids)
+            for listener in unknown_missions_event_listeners:
+                listener(unknown_uuids, cmdr)
+        return active_missions
+
+    def __switch_cmdr(self, cmdr: str):
+        """
+        Make the CMDR the current one. If they were active before, their active Missions are restored as they were.
+        Otherwise they are looked up from their synced active UUIDs, which loads their Missions again if they were
+        evicted.
+        """
+        previous_active = self._active_missions
+        cached_active = self._active_missions_by_cmdr.get(cmdr)
+        self._cmdr = cmdr
+        if cached_active is not None:
+            self._active_missions = cached_active
+        else:
+            self._active_missions = self.__look_up_active_missions(_active_uuids.get(cmdr, []), cmdr)
+        self._active_missions_by_cmdr[cmdr] = self._active_missions
+        self.__emit(added=self._active_missions.keys(), removed=previous_active.keys(), is_reset=True,
+                    restores_cmdr=cached_active is not None)
 
     def notify_about_new_mission_accepted(self, mission: dict, cmdr: str):
+        if not self.__has_mission_data():
+            self._buffered_events.append((self.notify_about_new_mission_accepted, (mission, cmdr)))
+            return
         logger.info(f"New Mission with ID {mission['MissionID']} has been accepted")
         #logger.debug(f"New Mission with ID {mission['MissionID']} has been accepted: %s",self._mission_store)
-        self._mission_store[cmdr][mission["MissionID"]] = mission
-        self._active_missions[mission["MissionID"]] = mission
-        self.update_all_listeners()
+        record = MissionRecord.from_event(mission)
+        active_uuids = _active_uuids.setdefault(cmdr, [])
+        if record.mission_id not in active_uuids:
+            active_uuids.append(record.mission_id)
+        self.__get_cmdr_missions(cmdr)[record.mission_id] = record
+        self.__touch(cmdr, record.mission_id)
+        if cmdr != self._cmdr:
+            self.__switch_cmdr(cmdr)
+        was_active = record.mission_id in self._active_missions
+        self._active_missions[record.mission_id] = record
+        if was_active:
+            self.__emit(changed=(record.mission_id,), store_changed=True)
+        else:
+            self.__emit(added=(record.mission_id,), store_changed=True)
+        self.__evict_missions()
 
     def notify_about_mission_gone(self, mission_uuid: int):
         # Should be called when the Mission is handed in or when the Mission has failed
+        if not self.__has_mission_data():
+            self._buffered_events.append((self.notify_about_mission_gone, (mission_uuid,)))
+            return
         logger.info(f"Mission with ID {mission_uuid} has been removed")
-        del self._active_missions[mission_uuid]
-        global active_missions_changed_event_listeners
-        for listener in active_missions_changed_event_listeners:
-            listener(self._active_missions)
+        self.__forget_active_uuids([mission_uuid])
+        if self._active_missions.pop(mission_uuid, None) is not None:
+            # Recently completed Missions are kept longer
+            self.__touch(self._cmdr, mission_uuid)
+            self.__emit(removed=(mission_uuid,))
+
+    def __forget_active_uuids(self, mission_uuids: Iterable[int]):
+        """
+        Remove Missions from the active UUIDs of the current CMDR, so they are not brought back once more Mission Data
+        arrives. They may not even be in the Mission Store yet.
+        """
+        active_uuids = _active_uuids.get(self._cmdr) if self._cmdr is not None else None
+        if active_uuids is None:
+            return
+        gone = set(mission_uuids)
+        active_uuids[:] = [uuid for uuid in active_uuids if uuid not in gone]
+
+    def notify_about_missions_expired(self, mission_uuids: list[int]):
+        """
+        Should be called once the Expiry of active Missions has passed (see Mission Expiry).
+        All of them are removed with a single Delta.
+        """
+        self.__forget_active_uuids(mission_uuids)
+        expired = [uuid for uuid in mission_uuids if self._active_missions.pop(uuid, None) is not None]
+        if len(expired) == 0:
+            return
+        logger.info(f"Missions with IDs {expired} have expired")
+        self.__emit(removed=expired)
 
     def notify_complete_mission_gone(self, mission_uuid: int):
         # 增加一个完成任务目标,并标记
+        if not self.__has_mission_data():
+            self._buffered_events.append((self.notify_complete_mission_gone, (mission_uuid,)))
+            return
         logger.info(f"Mission with ID {mission_uuid} has been Complete")
 
         #logger.debug(f"Mission with ID {mission_uuid} has been Complete: %s",self._active_missions[mission_uuid])
         # 标识已完成
-        self._active_missions[mission_uuid]["is_completed"] = True
-        self.update_all_listeners()
+        if mission_uuid not in self._active_missions:
+            logger.warning(f"Mission with ID {mission_uuid} is not active. Ignoring.")
+            return
+        self._active_missions[mission_uuid].is_completed = True
+        self.__emit(changed=(mission_uuid,), store_changed=True)
 
-    def update_all_listeners(self):
-        global active_missions_changed_event_listeners, all_missions_changed_event_listeners
+    def __emit(self, added: Iterable[int] = (), removed: Iterable[int] = (), changed: Iterable[int] = (),
+               is_reset: bool = False, store_changed: bool = False, restores_cmdr: bool = False):
+        """
+        Pass a Delta to the delta listeners, then the full active Missions to the full-dict listeners.
+        """
+        delta = MissionDelta(next(_delta_versions), self._cmdr, frozenset(added), frozenset(removed),
+                             frozenset(changed), is_reset, restores_cmdr)
+        for listener in active_missions_delta_listeners:
+            listener(delta, self._active_missions)
         for listener in active_missions_changed_event_listeners:
             listener(self._active_missions)
-        for listener in all_missions_changed_event_listeners:
-            listener(self._mission_store[self._cmdr])
+        if store_changed:
+            for listener in all_missions_changed_event_listeners:
+                listener(self._mission_store.get(self._cmdr, {}))
+
+    def update_all_listeners(self):
+        """
+        Pass all active Missions to every listener, as a Delta with is_reset set.
+        """
+        self.__emit(added=self._active_missions.keys(), removed=self._active_missions.keys(), is_reset=True,
+                    store_changed=True)
 
 
 mission_repository: Optional[MissionRepository] = None
 
+_pending_mission_data: list[Callable[[MissionRepository], None]] = []
+"""
+Mission Data passed by other Threads, stored as Functions passing the data to the Mission Repository
+"""
+_pending_mission_data_lock = threading.Lock()
 
-def set_new_repo(missions: dict[str, dict[int, dict]]):
+
+def set_new_repo(missions: Optional[dict[str, dict[int, MissionRecord]]] = None):
+    """
+    Create a new Mission Repository. If no Missions are passed, the Repository waits for them to be passed later
+    via set_pending_mission_data or set_pending_mission_loader.
+    """
     global mission_repository
     mission_repository = MissionRepository(missions)
 
 
+def set_pending_mission_data(missions: dict[str, dict[int, MissionRecord]]):
+    """
+    **To be called from a Thread building or resolving Mission Data.**
+
+    Store the Mission Data until apply_pending_mission_data is invoked on the main thread.
+    """
+    with _pending_mission_data_lock:
+        _pending_mission_data.append(lambda repo: repo.notify_about_mission_data(missions))
+
+
+def set_pending_mission_loader(mission_loader: Callable[[str], dict[int, MissionRecord]]):
+    """
+    **To be called from a Thread building Mission Data.**
+
+    Store the Mission Loader until apply_pending_mission_data is invoked on the main thread.
+    """
+    with _pending_mission_data_lock:
+        _pending_mission_data.append(lambda repo: repo.notify_about_mission_loader(mission_loader))
+
+
+def apply_pending_mission_data():
+    """
+    **To be called from the main thread.**
+
+    Pass Mission Data stored by set_pending_mission_data and set_pending_mission_loader to the Mission Repository.
+    Does nothing if there is none.
+    """
+    with _pending_mission_data_lock:
+        pending = list(_pending_mission_data)
+        _pending_mission_data.clear()
+    if mission_repository is None:
+        return
+    for notify in pending:
+        notify(mission_repository)
+
+
+def is_building_mission_index() -> bool:
+    """
+    True as long as the Mission Repository is still waiting for the Mission Data
+    """
+    return mission_repository is not None and \
+        mission_repository.state & MissionRepoState.HAS_MISSION_DATA != MissionRepoState.HAS_MISSION_DATA
+
+
+def set_store_budget(budget: int):
+    """
+    Set how many Missions the Mission Store keeps at most. 0 for no limit.
+    """
+    global _store_budget
+    _store_budget = budget
+    if mission_repository is not None:
+        mission_repository.set_store_budget(budget)
+
+
 def set_active_uuids(uuids: list[int], cmdr: str):
-    global _active_uuids, _active_uuids_init
-    _active_uuids.clear()
-    _active_uuids.extend(uuids)
-    _active_uuids_init = True
+    global _active_cmdr
+    _active_cmdr = cmdr
+    _active_uuids[cmdr] = list(uuids)
 
     if mission_repository is not None:
-        mission_repository.notify_about_active_mission_uuids(_active_uuids, cmdr)
+        mission_repository.notify_about_active_mission_uuids(_active_uuids[cmdr], cmdr)
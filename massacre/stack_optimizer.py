@@ -0,0 +1,250 @@
+"""
+This Module finds the best Massacre Stack that can be built from the active Missions and Missions on offer.
+
+A Stack only needs as many Kills as its highest Faction needs (the Stack Height), as every Kill counts for one
+Mission of each Faction. So the best Stack is not simply the one with the most Reward, but the one with the most
+Reward (or Mission Kills) per Kill you actually have to do, while staying below the Mission Cap.
+
+Within one Faction this is a Knapsack Problem: For every possible Stack Height, which Missions of this Faction give
+the most Reward without going above that Height? The Factions are then combined under the Mission Cap. All Missions
+passed in should share their Target (see the Warnings of MassacreMissionData), otherwise they do not stack.
+
+Run this Module to benchmark it: python -m massacre.stack_optimizer [Candidates] [Runs]
+"""
+import random
+import time
+import sys
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable, Iterable, Optional
+
+from massacre.massacre_mission_state import MassacreMission
+
+MAX_ACTIVE_MISSIONS = 20
+"""
+How many Missions the game allows to be active at the same time
+"""
+
+
+class Objective(Enum):
+    REWARD_PER_KILL = "reward_per_kill"
+    """Most Reward per required Kill"""
+    RATIO = "ratio"
+    """Most Mission Kills per required Kill (the Stack Ratio)"""
+
+
+@dataclass(frozen=True)
+class StackPlan:
+    """
+    The Missions to keep, abandon and accept for the best Stack
+    """
+    missions: tuple[MassacreMission, ...]
+    """All Missions of the Stack, including the completed ones"""
+    keep: tuple[MassacreMission, ...]
+    abandon: tuple[MassacreMission, ...]
+    accept: tuple[MassacreMission, ...]
+    stack_height: int
+    """Kills required for the Stack"""
+    target_sum: int
+    """Kills of all Missions of the Stack"""
+    reward: int
+    largest_delta: int
+    """
+    The largest Δmax of any Faction in the Stack, i.e. how far the lowest Faction is below the Stack Height.
+    Of two otherwise equal Stacks with different Heights the one with the smaller Δmax is picked. Equal Stacks of
+    the same Height are not told apart by their Δmax.
+    """
+
+    @property
+    def reward_per_kill(self) -> float:
+        return self.reward / self.stack_height if self.stack_height > 0 else 0.0
+
+    @property
+    def ratio(self) -> float:
+        return self.target_sum / self.stack_height if self.stack_height > 0 else 0.0
+
+
+class _FactionOptions:
+    """
+    The best Choices of Missions of one Faction. For k Missions and a Kill Count c, _best[k][c] is the highest Value
+    reachable with exactly k Missions of exactly c Kills in total, and the Missions it is made of.
+    """
+
+    def __init__(self, missions: list[MassacreMission], value: Callable[[MassacreMission], int], mission_cap: int):
+        self.missions = missions
+        max_count = min(len(missions), mission_cap)
+        self._best: list[dict[int, tuple[int, int]]] = [{} for _ in range(max_count + 1)]
+        """Value and Bitmask of the chosen Missions, by Kill Count, by Mission Count"""
+        self._best[0][0] = (0, 0)
+        for i, mission in enumerate(missions):
+            bit = 1 << i
+            for k in range(max_count, 0, -1):
+                below = self._best[k - 1]
+                if len(below) == 0:
+                    continue
+                current = self._best[k]
+                for kills, (total, mask) in list(below.items()):
+                    kills += mission.count
+                    total += value(mission)
+                    existing = current.get(kills)
+                    if existing is None or existing[0] < total:
+                        current[kills] = (total, mask | bit)
+
+        self._choices = sorted((kills, k, total, mask) for k, by_kills in enumerate(self._best) if k > 0
+                               for kills, (total, mask) in by_kills.items())
+        """All Choices, by Kill Count"""
+        self.heights = sorted({x[0] for x in self._choices})
+        """All Kill Counts this Faction can end up with"""
+        self.best_below: list[tuple[int, int, int]] = [(0, 0, 0)] + [(-1, 0, 0)] * max_count
+        """Value, Kills and Bitmask of the best Choice with k Missions, up to the current Height. -1 if none."""
+        self._next_choice = 0
+
+    def raise_height(self, height: int) -> bool:
+        """
+        Allow Choices up to the given Height. Return whether any Choice in best_below improved.
+        """
+        improved = False
+        while self._next_choice < len(self._choices) and self._choices[self._next_choice][0] <= height:
+            kills, k, total, mask = self._choices[self._next_choice]
+            self._next_choice += 1
+            if total > self.best_below[k][0]:
+                self.best_below[k] = (total, kills, mask)
+                improved = True
+        return improved
+
+    def chosen(self, mask: int) -> list[MassacreMission]:
+        return [mission for i, mission in enumerate(self.missions) if mask & (1 << i)]
+
+
+def __combine(factions: list[_FactionOptions], mission_cap: int) -> tuple[int, tuple[tuple[int, int], ...]]:
+    """
+    Combine the best Choices of all Factions so at most mission_cap Missions are used.
+    Return the highest Value and the Mission Count chosen for every Faction as (Faction Index, Mission Count).
+    """
+    # best[j] = Value and Choices for exactly j Missions in total
+    best: list[Optional[tuple[int, tuple[tuple[int, int], ...]]]] = [(0, ())] + [None] * mission_cap
+    for index, faction in enumerate(factions):
+        combined: list[Optional[tuple[int, tuple[tuple[int, int], ...]]]] = [None] * (mission_cap + 1)
+        for j, entry in enumerate(best):
+            if entry is None:
+                continue
+            for k, (total, _kills, _mask) in enumerate(faction.best_below):
+                if total < 0 or j + k > mission_cap:
+                    continue
+                candidate = combined[j + k]
+                if candidate is None or candidate[0] < entry[0] + total:
+                    combined[j + k] = (entry[0] + total, entry[1] + ((index, k),))
+        best = combined
+    return max((x for x in best if x is not None), key=lambda x: x[0])
+
+
+def __value_of(objective: Objective) -> Callable[[MassacreMission], int]:
+    if objective == Objective.RATIO:
+        return lambda mission: mission.count
+    return lambda mission: mission.reward
+
+
+def find_best_stack(current: Iterable[MassacreMission], candidates: Iterable[MassacreMission],
+                    objective: Objective = Objective.REWARD_PER_KILL,
+                    mission_cap: int = MAX_ACTIVE_MISSIONS) -> Optional[StackPlan]:
+    """
+    Find the Missions to keep, abandon and accept for the best Stack under the Mission Cap.
+
+    Completed Missions are always kept, as their Kills are done. They only take up a Slot.
+
+    :param current: The active Massacre Missions
+    :param candidates: The Massacre Missions on offer
+    :return: The best Stack, or None if there are no Missions
+    """
+    current = list(current)
+    completed = [x for x in current if x.is_completed]
+    open_missions = [x for x in current if not x.is_completed] + list(candidates)
+    mission_cap -= len(completed)
+    if len(open_missions) == 0 or mission_cap <= 0:
+        return None
+
+    value = __value_of(objective)
+    by_faction: dict[str, list[MassacreMission]] = {}
+    for mission in open_missions:
+        by_faction.setdefault(mission.source_faction, []).append(mission)
+    factions = [_FactionOptions(missions, value, mission_cap) for missions in by_faction.values()]
+
+    # No Stack can be worth more than the most valuable Missions that fit under the Cap
+    upper_bound = sum(sorted(map(value, open_missions), reverse=True)[:mission_cap])
+
+    best: Optional[tuple[tuple[float, int], int, list[tuple[int, int]]]] = None
+    for height in sorted({height for faction in factions for height in faction.heights if height > 0}):
+        if best is not None and upper_bound / height < best[0][0]:
+            # Larger Heights can only be worse
+            break
+        improved = [faction.raise_height(height) for faction in factions]
+        if not any(improved):
+            continue
+        total, choices = __combine(factions, mission_cap)
+        choices = tuple((i, k) for i, k in choices if k > 0)
+        if len(choices) == 0:
+            continue
+        stack_height = max(factions[i].best_below[k][1] for i, k in choices)
+        lowest = min(factions[i].best_below[k][1] for i, k in choices)
+        # Higher Value per Kill first, then the smaller Δmax
+        score = (total / stack_height, -(stack_height - lowest))
+        if best is None or score > best[0]:
+            best = (score, stack_height, [(i, factions[i].best_below[k][2]) for i, k in choices])
+
+    if best is None:
+        return None
+    chosen = [mission for i, mask in best[2] for mission in factions[i].chosen(mask)]
+    return __build_plan(current, completed, chosen)
+
+
+def __build_plan(current: list[MassacreMission], completed: list[MassacreMission],
+                 chosen: list[MassacreMission]) -> StackPlan:
+    chosen_ids = {x.id for x in chosen}
+    current_ids = {x.id for x in current}
+    missions = completed + chosen
+    kills_by_faction: dict[str, int] = {}
+    for mission in chosen:
+        kills_by_faction[mission.source_faction] = kills_by_faction.get(mission.source_faction, 0) + mission.count
+    stack_height = max(kills_by_faction.values())
+    return StackPlan(
+        tuple(missions),
+        tuple(x for x in current if x.is_completed or x.id in chosen_ids),
+        tuple(x for x in current if not x.is_completed and x.id not in chosen_ids),
+        tuple(x for x in chosen if x.id not in current_ids),
+        stack_height,
+        sum(x.count for x in chosen),
+        sum(x.reward for x in missions),
+        stack_height - min(kills_by_faction.values()),
+    )
+
+
+def __random_missions(rng: random.Random, amount: int, first_id: int) -> list[MassacreMission]:
+    factions = [f"Faction {i}" for i in range(rng.randint(5, 8))]
+    return [
+        MassacreMission("Pirates", rng.randint(4, 60), rng.randint(5, 80) * 100_000, "Target System", "Pirates",
+                        rng.choice(factions), rng.random() < 0.5, False, first_id + i)
+        for i in range(amount)
+    ]
+
+
+def __benchmark(candidate_count: int, runs: int):
+    rng = random.Random(0)
+    durations: list[float] = []
+    for _ in range(runs):
+        current = __random_missions(rng, 10, 0)
+        candidates = __random_missions(rng, candidate_count, 1000)
+        for objective in Objective:
+            start = time.perf_counter()
+            find_best_stack(current, candidates, objective)
+            durations.append(time.perf_counter() - start)
+    durations.sort()
+    print(f"{candidate_count} Candidates (+10 active), {len(durations)} Runs: "
+          f"median {durations[len(durations) // 2] * 1000:.1f} ms, max {durations[-1] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        __benchmark(int(sys.argv[1]), int(sys.argv[2]) if len(sys.argv) > 2 else 20)
+    else:
+        for count in (20, 30, 40):
+            __benchmark(count, 20)
@@ -0,0 +1,149 @@
+"""
+This Module draws the Table of the UI without destroying and re-creating its Labels on every update.
+
+Each cell (row, column) keeps a Label per colour. A render only reconfigures the cells whose text or layout changed, and hides
+the cells that are no longer used, so they can be shown again later. Tk only has to redraw what actually changed.
+
+Run this Module to benchmark it against re-creating all Labels: python -m massacre.table_renderer [Factions...]
+(needs a Display)
+"""
+import sys
+import time
+import tkinter as tk
+from typing import Callable, Optional, Union
+
+
+class _Cell:
+    __slots__ = ("label", "text", "grid_options", "is_shown", "is_used", "on_click")
+
+    def __init__(self, label: tk.Label):
+        self.label = label
+        self.text: Optional[str] = None
+        self.grid_options: Optional[tuple] = None
+        self.is_shown = False
+        self.is_used = False
+        self.on_click: Optional[Callable[[], None]] = None
+
+    def click(self, _event):
+        if self.on_click is not None:
+            self.on_click()
+
+
+class TableRenderer:
+    """
+    Keeps a Label per (row, column, colour) of a Frame. Call begin, then cell for every cell to show, then end.
+
+    The colour is part of the key, because the Theme only picks up the colour of new Labels. So a cell that is shown
+    in another colour (e.g. after rows moved down) uses another Label, and the first one is hidden until it is needed
+    again.
+    """
+
+    def __init__(self, frame: tk.Frame, create_label: Callable[..., tk.Label] = tk.Label):
+        self.frame = frame
+        self._create_label = create_label
+        self._cells: dict[tuple[int, int, Optional[str]], _Cell] = {}
+        self.created = 0
+        """Labels created during the last render"""
+        self.changed = 0
+        """Labels reconfigured (or created) during the last render"""
+
+    def begin(self):
+        self.created = 0
+        self.changed = 0
+        for cell in self._cells.values():
+            cell.is_used = False
+
+    def cell(self, row: int, column: int, text: Union[str, int], fg: Optional[str] = None, columnspan: int = 1,
+             sticky: str = tk.W, pady: Union[int, tuple[int, int]] = 0, on_click: Optional[Callable[[], None]] = None):
+        """
+        Show a Label in the given cell. Does nothing if it already shows exactly this.
+
+        :param on_click: Invoked when the Label is clicked
+        """
+        text = str(text)
+        key = (row, column, fg)
+        cell = self._cells.get(key)
+        if cell is None:
+            label = self._create_label(self.frame, text=text) if fg is None \
+                else self._create_label(self.frame, text=text, fg=fg)
+            cell = self._cells[key] = _Cell(label)
+            cell.text = text
+            label.bind("<Button-1>", cell.click)
+            self.created += 1
+            self.changed += 1
+        elif cell.text != text:
+            cell.label.config(text=text)
+            cell.text = text
+            self.changed += 1
+
+        grid_options = (columnspan, sticky, pady)
+        if not cell.is_shown or cell.grid_options != grid_options:
+            cell.label.grid(row=row, column=column, columnspan=columnspan, sticky=sticky, pady=pady)
+            cell.grid_options = grid_options
+            cell.is_shown = True
+            self.changed += 1
+        cell.on_click = on_click
+        cell.is_used = True
+
+    def end(self):
+        """
+        Hide all cells that were not shown since begin. They are kept for later renders.
+        """
+        for cell in self._cells.values():
+            if cell.is_shown and not cell.is_used:
+                cell.label.grid_remove()
+                cell.is_shown = False
+                self.changed += 1
+
+    def clear(self):
+        """
+        Destroy all Labels, e.g. after the Frame was replaced
+        """
+        for cell in self._cells.values():
+            cell.label.destroy()
+        self._cells.clear()
+
+
+def __render_table(table: TableRenderer, factions: int, kills: int):
+    table.begin()
+    for row in range(factions):
+        table.cell(row, 0, f"Faction {row}")
+        table.cell(row, 1, f"{row % 4}/4")
+        table.cell(row, 2, f"{kills}/{kills + row}", sticky=tk.W + tk.E)
+        table.cell(row, 3, f"{row * 1.5:.1f} (0.0)")
+        table.cell(row, 4, str(row))
+    table.cell(factions, 0, "Sum", fg="green")
+    table.end()
+
+
+def __benchmark(faction_counts: list[int], runs: int = 50):
+    root = tk.Tk()
+    for factions in faction_counts:
+        rebuild_frame = tk.Frame(root)
+        rebuild_frame.pack()
+        start = time.perf_counter()
+        for run in range(runs):
+            # What the UI did before: throw everything away and create it again
+            for child in rebuild_frame.winfo_children():
+                child.destroy()
+            __render_table(TableRenderer(rebuild_frame), factions, run)
+            root.update_idletasks()
+        rebuild = (time.perf_counter() - start) / runs
+        rebuild_frame.destroy()
+
+        pooled_frame = tk.Frame(root)
+        pooled_frame.pack()
+        table = TableRenderer(pooled_frame)
+        start = time.perf_counter()
+        for run in range(runs):
+            __render_table(table, factions, run)
+            root.update_idletasks()
+        pooled = (time.perf_counter() - start) / runs
+        print(f"{factions:3} Factions: re-create {rebuild * 1000:6.2f} ms, pooled {pooled * 1000:6.2f} ms "
+              f"({table.changed} Labels changed per render)")
+        pooled_frame.destroy()
+    root.destroy()
+
+
+if __name__ == "__main__":
+    __benchmark([int(x) for x in sys.argv[1:]] or [5, 10, 20, 40])
@@ -1,19 +1,45 @@
 import json
 import l10n
+import logging
+import time
+import datetime as dt
 import functools
 import tkinter as tk
-from typing import Optional
+from typing import Callable, Mapping, Optional
 from dataclasses import dataclass
 
 import massacre.massacre_settings
-from massacre.massacre_mission_state import massacre_mission_listeners, MassacreMission
+import massacre.mission_repository
+from massacre import mission_expiry, kill_progress
+from massacre.kill_progress import kill_progress_listeners
+from massacre.massacre_mission_state import massacre_snapshot_listeners, MassacreMission, MassacreMissionSnapshot
+from massacre.massacre_mission_aggregate import MassacreMissionSummary, StackKey
 from massacre.massacre_settings import Configuration
+from massacre.stack_optimizer import MAX_ACTIVE_MISSIONS
+from massacre.table_renderer import TableRenderer
+from massacre.update_scheduler import scheduler, build_tk_dispatcher
 from massacre.logger_factory import logger
 from massacre.version_check import open_download_page
 from theme import theme
 
 _ = functools.partial(l10n.Translations.translate, context=__file__)
 
+
+def _build_warnings(target_factions: list[str], target_types: list[str], target_systems: list[str]) -> list[str]:
+    """
+    Warn the User if there is more than one Target Faction, Target Type or Target System in the Stack.
+    The names are sorted, so the Warnings do not depend on the order the Missions were accepted in.
+    """
+    warnings: list[str] = []
+    if len(target_factions) > 1:
+        warnings.append(f"{_('Multiple Target Factions')}: {', '.join(sorted(target_factions))}!")
+    if len(target_types) > 1:
+        warnings.append(f"{_('Multiple Target Types')}: {', '.join(sorted(target_types))}!")
+    if len(target_systems) > 1:
+        warnings.append(f"{_('Multiple Target Systems')}: {', '.join(sorted(target_systems))}!")
+    return warnings
+
+
 class MassacreMissionData:
     """
     Creates a "data-view" for the UI from all massacre missions. Will be used to create a table-like UI
@@ -31,20 +57,21 @@ class MassacreMissionData:
         shareable_reward: int
 
 
-    def __init__(self, massacre_state: dict[int, MassacreMission]):
+    def __init__(self, massacre_state: Mapping[int, MassacreMission]):
         self.warnings: list[str] = []
         # if Log Level is set to DEBUG, this will output the current Massacre Mission State to the Log File.
         # for easy searching, you can Ctrl+F for "MASSACRE_MISSION_DATA_INPUT" and get the line below that.
-        logger.debug("MassacreMissionData input below: MASSACRE_MISSION_DATA_INPUT")
-        try:
-            debug_message_state: dict[int, dict] = {}
-            for k in massacre_state.keys():
-                v = massacre_state[k]
-                debug_message_state[k] = v.as_dict()
-            logger.debug(json.dumps(debug_message_state))
-        except Exception:
-            logger.error("Failed to Log debug_message_state")
-            pass
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("MassacreMissionData input below: MASSACRE_MISSION_DATA_INPUT")
+            try:
+                debug_message_state: dict[int, dict] = {}
+                for k in massacre_state.keys():
+                    v = massacre_state[k]
+                    debug_message_state[k] = v.as_dict()
+                logger.debug(json.dumps(debug_message_state))
+            except Exception:
+                logger.error("Failed to Log debug_message_state")
+                pass
         # Faction -> <Count, Reward, ShareableReward, DistanceToMax>
         target_factions: list[str] = []
         """
@@ -151,12 +178,7 @@ class MassacreMissionData:
                 self.killcmpcount = faction_state.killcmpcount
 
         # Check for Warnings
-        if len(target_factions) > 1:
-            self.warnings.append(f"{_('Multiple Target Factions')}: {', '.join(target_factions)}!")
-        if len(target_types) > 1:
-            self.warnings.append(f"{_('Multiple Target Types')}: {', '.join(target_types)}!")
-        if len(target_systems) > 1:
-            self.warnings.append(f"{_('Multiple Target Systems')}: {', '.join(target_systems)}!")
+        self.warnings = _build_warnings(target_factions, target_types, target_systems)
 
         # Calculate before_stack_height
         for faction_state in self.faction_to_count_lookup.values():
@@ -165,6 +187,41 @@ class MassacreMissionData:
         if self.before_stack_height == 0:  # No other elements. All at max value.
             self.before_stack_height = self.stack_height
 
+    @classmethod
+    def from_summary(cls, summary: MassacreMissionSummary) -> "MassacreMissionData":
+        """
+        Create the "data-view" from the Totals kept by the Massacre Mission State, instead of computing it
+        from all Missions again. Costs O(Factions).
+        """
+        data = cls.__new__(cls)
+        data.faction_to_count_lookup = {
+            name: MassacreMissionData.FactionState(x.allnum, x.cmpnum, x.killcmpcount, x.killcount, x.reward,
+                                                   x.shareable_reward)
+            for name, x in summary.factions.items()
+        }
+        data.stack_height = summary.stack_height
+        data.before_stack_height = summary.before_stack_height
+        data.target_sum = summary.target_sum
+        data.reward = summary.reward
+        data.shareable_reward = summary.shareable_reward
+        data.mission_count = summary.mission_count
+        data.cmpmission_count = summary.cmpmission_count
+        data.cmpreward = summary.cmpreward
+        data.cmpshareable_reward = summary.cmpshareable_reward
+        data.killcmpcount = summary.killcmpcount
+        data.warnings = _build_warnings(list(summary.target_factions), list(summary.target_types),
+                                        list(summary.target_systems))
+        return data
+
+    def differences(self, other: "MassacreMissionData") -> list[str]:
+        """
+        Return the names of all fields that differ
+        """
+        fields = ["faction_to_count_lookup", "stack_height", "before_stack_height", "target_sum", "reward",
+                  "shareable_reward", "mission_count", "cmpmission_count", "cmpreward", "cmpshareable_reward",
+                  "killcmpcount", "warnings"]
+        return [x for x in fields if getattr(self, x) != getattr(other, x)]
+
 
 class GridUiSettings:
     """
@@ -177,6 +234,64 @@ class GridUiSettings:
         self.mission_count = config.display_mission_count
 
 
+class _DrillDown:
+    """
+    The Factions whose Missions are shown below their row in the Table. The rows of a Faction are only built once it
+    is expanded, and kept until its Missions change. Collapsed Factions cost nothing.
+    """
+
+    def __init__(self, on_toggle: Callable[[], None]):
+        self._on_toggle = on_toggle
+        self._missions: Mapping[int, MassacreMission] = {}
+        self._expanded: set[tuple[Optional[StackKey], str]] = set()
+        """(Stack, Faction) of every expanded Faction. The Stack is None if only one Stack is shown."""
+        self._rows: dict[tuple[Optional[StackKey], str], tuple[tuple, list[list[str]]]] = {}
+        """Signature of the Missions and the Rows built from them, for every expanded Faction"""
+
+    def set_missions(self, missions: Mapping[int, MassacreMission]):
+        self._missions = missions
+
+    def is_expanded(self, stack: Optional[StackKey], faction: str) -> bool:
+        return (stack, faction) in self._expanded
+
+    def toggle(self, stack: Optional[StackKey], faction: str):
+        key = (stack, faction)
+        if key in self._expanded:
+            self._expanded.remove(key)
+            self._rows.pop(key, None)
+        else:
+            self._expanded.add(key)
+        self._on_toggle()
+
+    def rows(self, stack: Optional[StackKey], faction: str) -> list[list[str]]:
+        """
+        Return the Rows of all Missions of an expanded Faction
+        """
+        missions = sorted((x for x in self._missions.values()
+                           if x.source_faction == faction and (stack is None or StackKey.of(x) == stack)),
+                          key=lambda x: x.id)
+        signature = tuple((x, kill_progress.get_kills_done(x.id)) for x in missions)
+        cached = self._rows.get((stack, faction))
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        rows = [self.__build_row(mission, kills_done) for mission, kills_done in signature]
+        self._rows[(stack, faction)] = (signature, rows)
+        return rows
+
+    @staticmethod
+    def __build_row(mission: MassacreMission, kills_done: int) -> list[str]:
+        expiry = mission_expiry.parse_expiry(mission.expiry)
+        expiry_str = dt.datetime.fromtimestamp(expiry).strftime("%m-%d %H:%M") if expiry is not None else ""
+        remaining = 0 if mission.is_completed else max(mission.count - kills_done, 0)
+        reward_str = "{:.1f}".format(float(mission.reward) / 1_000_000)
+        return [
+            f"   {expiry_str}",
+            _("Completed") if mission.is_completed else "",
+            f"{remaining}/{mission.count}",
+            f"{reward_str} ({_('Wing')})" if mission.is_wing else reward_str,
+        ]
+
+
 def __get_row_width(settings: GridUiSettings) -> int:
     """
     Return how many columns wide the Table is.
@@ -187,103 +302,102 @@ def __get_row_width(settings: GridUiSettings) -> int:
     return 4
 
 
-def _display_no_data_info(frame: tk.Frame):
+def _display_no_data_info(table: TableRenderer):
     """
     Generate the warning that is displayed if the Missions-Event has yet to be received.
 
     Return Row-Pointer for next row
     """
 
-    warning_label = tk.Label(frame, text=_("Missing Active Mission Data")+"\n"+_("If you are in game, go to main menu and come back"))
-    warning_label.config(foreground="yellow")
-    warning_label.grid(column=0, row=0)
+    table.cell(0, 0, _("Missing Active Mission Data")+"\n"+_("If you are in game, go to main menu and come back"),
+               fg="yellow", sticky="")
 
     return 1
 
 
-def __display_data_header(frame: tk.Frame, settings: GridUiSettings, row=0):
+def __display_data_header(table: TableRenderer, settings: GridUiSettings, row=0):
     """
     Display the Labels of the Table
     """
+    frame = table.frame
     for col in range(3+ int(settings.delta)):  # 根据是否包含 delta 列调整列数
         frame.grid_columnconfigure(col,weight=0)
     frame.grid_columnconfigure(0,minsize=120, weight=1) #设定首列最小可拉伸
     # todo 看看能否在此处派系后方插入一个切换按钮
-    faction_label = tk.Label(frame, text=_("Faction"))
-    missionnum_label = tk.Label(frame, text=_("R/T")) # 增加任务个数
-    kills_label = tk.Label(frame, text=_("KRM/REQ"))
-    payout_label = tk.Label(frame, text=_("Reward (Wing)"))
-
-    ui_elements = [faction_label, missionnum_label, kills_label, payout_label]
+    ui_elements = [_("Faction"), _("R/T"), _("KRM/REQ"), _("Reward (Wing)")] # 增加任务个数
     if settings.delta:
         # noinspection SpellCheckingInspection
-        delta_label = tk.Label(frame, text=_("Δmax"))
-        ui_elements.append(delta_label)
+        ui_elements.append(_("Δmax"))
 
     for i, item in enumerate(ui_elements):
-        item.grid(row=row, column=i, sticky=tk.W)
+        table.cell(row, i, item)
 
 
-def __display_row(frame: tk.Frame, faction: str, data: MassacreMissionData.FactionState, max_count: int,
-                  settings: GridUiSettings, row: int, second_largest_count: int):
+def __display_row(table: TableRenderer, faction: str, data: MassacreMissionData.FactionState, max_count: int,
+                  settings: GridUiSettings, row: int, second_largest_count: int, kills_done: int,
+                  drill_down: _DrillDown, stack: Optional[StackKey]) -> int:
     """
-    Draw one Data-Row for the Table
+    Draw one Data-Row for the Table, and the rows of its Missions if the Faction is expanded.
+    Clicking the Faction expands or collapses it.
+
+    :param kills_done: Kills done for the Missions of this Faction that are not completed yet (see kill_progress)
+    :return: Row-Pointer for next row
     """
     reward_str = "{:.1f}".format(float(data.reward) / 1_000_000)
     shareable_reward_str = "{:.1f}".format(float(data.shareable_reward) / 1_000_000)
 
-    faction_label = tk.Label(frame, text=faction)
     cmpnum_sum = int(data.allnum) - int(data.cmpnum)
-    missionnum_label = tk.Label(frame, text=f"{cmpnum_sum}/{data.allnum}") # 增加任务个数
-    killscmp_sum =int(data.killcount) - int(data.killcmpcount)
-    kills_label = tk.Label(frame, text=f"{killscmp_sum}/{data.killcount}") # 修改击杀数显示
-    payout_label = tk.Label(frame, text=f"{reward_str} ({shareable_reward_str})")
-
-    ui_elements = [faction_label, missionnum_label, kills_label, payout_label]
+    killscmp_sum = max(int(data.killcount) - int(data.killcmpcount) - kills_done, 0)
+    is_expanded = drill_down.is_expanded(stack, faction)
+    ui_elements = [
+        f"{'▾' if is_expanded else '▸'} {faction}",
+        f"{cmpnum_sum}/{data.allnum}", # 增加任务个数
+        f"{killscmp_sum}/{data.killcount}", # 修改击杀数显示
+        f"{reward_str} ({shareable_reward_str})",
+    ]
     sticky_settings = [tk.W, tk.W, tk.W+tk.E , tk.W, tk.E] #考虑到delta多定义一个
     if settings.delta: 
         # Calculate difference
         delta = max_count - data.killcount
         text = delta if delta > 0 else second_largest_count - max_count
-        delta_label = tk.Label(frame, text=str(text))
-        ui_elements.append(delta_label)
-        #delta_label.grid(row=row, column=4)# 列数+1 3改4
+        ui_elements.append(str(text))
 
+    on_click = functools.partial(drill_down.toggle, stack, faction)
     for i, element in enumerate(ui_elements):
-        element.grid(row=row, column=i, sticky=sticky_settings[i])
+        table.cell(row, i, element, sticky=sticky_settings[i], on_click=on_click if i == 0 else None)
+    row += 1
+
+    if is_expanded:
+        for mission_row in drill_down.rows(stack, faction):
+            for i, element in enumerate(mission_row):
+                table.cell(row, i, element, fg="gray", sticky=sticky_settings[i])
+            row += 1
+    return row
 
-def __display_cmpsum(frame: tk.Frame, data: MassacreMissionData, _settings: GridUiSettings, row: int):
+def __display_cmpsum(table: TableRenderer, data: MassacreMissionData, _settings: GridUiSettings, row: int):
     """
     增加一行显示当前已完成的任务合计
     """
-    label = tk.Label(frame, text=_("CompletedSum"))
-    
-    cmp_num = tk.Label(frame, text=data.cmpmission_count) # 已完成任务数量
-    kill_sum = tk.Label(frame, text=data.killcmpcount) # 已完成任务的击杀数量
     reward_sum_normal = "{:.1f}".format(float(data.cmpreward) / 1_000_000)
     reward_sum_wing = "{:.1f}".format(float(data.cmpshareable_reward) / 1_000_000)
-    reward_sum = tk.Label(frame, text=f"{reward_sum_normal} ({reward_sum_wing})")
-    for i, entry in enumerate([label, cmp_num, kill_sum, reward_sum]):
-        entry.config(fg="YellowGreen")
-        entry.grid(row=row, column=i, sticky=tk.W)
+    # 已完成任务数量, 已完成任务的击杀数量
+    entries = [_("CompletedSum"), data.cmpmission_count, data.killcmpcount, f"{reward_sum_normal} ({reward_sum_wing})"]
+    for i, entry in enumerate(entries):
+        table.cell(row, i, entry, fg="YellowGreen")
 
-def __display_sum(frame: tk.Frame, data: MassacreMissionData, _settings: GridUiSettings, row: int):
+def __display_sum(table: TableRenderer, data: MassacreMissionData, _settings: GridUiSettings, row: int):
     """
     Display the Sum-Row containing the Reward-Sum and the amount of Kills required.
     """
-    label = tk.Label(frame, text=_("AcceptedSum"))
-    allmissionnum = tk.Label(frame, text=data.mission_count)
-    kill_sum = tk.Label(frame, text=data.stack_height)
     reward_sum_normal = "{:.1f}".format(float(data.reward) / 1_000_000)
     reward_sum_wing = "{:.1f}".format(float(data.shareable_reward) / 1_000_000)
-    reward_sum = tk.Label(frame, text=f"{reward_sum_normal} ({reward_sum_wing})")
+    entries = [_("AcceptedSum"), data.mission_count, data.stack_height, f"{reward_sum_normal} ({reward_sum_wing})"]
     sticky_settings = [tk.W, tk.E, tk.E, tk.E]
-    for i, entry in enumerate([label, allmissionnum, kill_sum, reward_sum]):
-        entry.config(fg="green")
-        entry.grid(row=row, column=i, sticky=sticky_settings[i])
+    for i, entry in enumerate(entries):
+        table.cell(row, i, entry, fg="green", sticky=sticky_settings[i])
 
 
-def __display_summary(frame: tk.Frame, data: MassacreMissionData, settings: GridUiSettings, row: int):
+def __display_summary(table: TableRenderer, data: MassacreMissionData, settings: GridUiSettings, row: int):
     ratio_text = "{:.2f}".format(float(data.target_sum)/float(data.stack_height))
     reward_in_millions = float(data.reward) / 1_000_000
     wing_reward_in_millions = float(data.shareable_reward) / 1_000_000
@@ -291,53 +405,99 @@ def __display_summary(frame: tk.Frame, data: MassacreMissionData, settings: Grid
     wing_reward_text = "{:.2f}".format(wing_reward_in_millions/data.stack_height)
     label_text = f"{_('Ratio')}: {ratio_text}, {_('Reward')}: {reward_text} ({wing_reward_text}) {_('M CR/Kill.')} {data.target_sum} {_('Kills')}."
 
-    label = tk.Label(frame, text=label_text, fg="green")
-    label.grid(row=row, column=0, columnspan=__get_row_width(settings), sticky=tk.W)
+    table.cell(row, 0, label_text, fg="green", columnspan=__get_row_width(settings))
 
 
-def __display_warning(frame: tk.Frame, warning: str, width: int, row: int):
-    label = tk.Label(frame, text=warning)
-    label.config(fg="yellow")
-    label.grid(column=0, columnspan=width, row=row, sticky=tk.W)
+def __display_warning(table: TableRenderer, warning: str, width: int, row: int):
+    table.cell(row, 0, warning, fg="yellow", columnspan=width)
 
 
-def _display_data(frame: tk.Frame, data: MassacreMissionData, settings: GridUiSettings) -> int:
-    __display_data_header(frame, settings)
-    row_pointer = 1
+def describe_stack(key: StackKey) -> str:
+    """
+    Title of a Stack, e.g. "Some Pirates (Some System, Pirate)"
+    """
+    target_type = key.target_type.removeprefix("$MissionUtil_FactionTag_").removesuffix(";")
+    return f"{key.target_faction} ({key.target_system}, {target_type})"
+
+
+def build_stack_data(stacks: Mapping[StackKey, MassacreMissionSummary]) -> list[tuple[StackKey, MassacreMissionData]]:
+    """
+    Create the "data-view" of every Stack of a Snapshot, see MassacreMissionSnapshot.stacks
+    """
+    return [(key, MassacreMissionData.from_summary(summary)) for key, summary in stacks.items()]
+
+
+def __display_stack_title(table: TableRenderer, key: StackKey, width: int, row: int):
+    table.cell(row, 0, describe_stack(key), columnspan=width, pady=(4, 0))
+
+
+def __display_stack(table: TableRenderer, data: MassacreMissionData, settings: GridUiSettings,
+                    kill_progress: Mapping[tuple[StackKey, str], int], key: Optional[StackKey], row_pointer: int,
+                    drill_down: _DrillDown, stack: Optional[StackKey]) -> int:
+    """
+    Display the Table of one Stack. Return Row-Pointer for next row
+
+    :param key: The Stack the Kill Progress is looked up for. None if there are no Missions.
+    :param stack: The Stack the Missions are expanded for, None if all Missions are shown in a single Table
+    """
+    __display_data_header(table, settings, row_pointer)
+    row_pointer += 1
     for faction in sorted(data.faction_to_count_lookup.keys()):
-        __display_row(frame, faction, data.faction_to_count_lookup[faction], data.stack_height, settings, row_pointer,
-                      data.before_stack_height)
-        row_pointer += 1
-        # todo 以后这里做按钮切换显示,显示每个派系下面各个任务信息
+        row_pointer = __display_row(table, faction, data.faction_to_count_lookup[faction], data.stack_height,
+                                    settings, row_pointer, data.before_stack_height,
+                                    kill_progress.get((key, faction), 0), drill_down, stack)
 
     if settings.sum:
-        __display_cmpsum(frame, data, settings, row_pointer)
+        __display_cmpsum(table, data, settings, row_pointer)
         row_pointer += 1
-        __display_sum(frame, data, settings, row_pointer)
+        __display_sum(table, data, settings, row_pointer)
         row_pointer += 1
 
     if settings.summary:
-        __display_summary(frame, data, settings, row_pointer)
+        __display_summary(table, data, settings, row_pointer)
         row_pointer += 1
+    return row_pointer
+
+
+def _display_data(table: TableRenderer, data: MassacreMissionData, stacks: list[tuple[StackKey, MassacreMissionData]],
+                  settings: GridUiSettings, kill_progress: Mapping[tuple[StackKey, str], int],
+                  drill_down: _DrillDown) -> int:
     full_width = __get_row_width(settings)
+    row_pointer = 0
+    if len(stacks) > 1:
+        # Separate Stacks are shown on their own, so there is no need to warn about multiple Targets
+        for key, stack in stacks:
+            __display_stack_title(table, key, full_width, row_pointer)
+            row_pointer = __display_stack(table, stack, settings, kill_progress, key, row_pointer + 1, drill_down,
+                                          key)
+    else:
+        key = stacks[0][0] if len(stacks) > 0 else None
+        row_pointer = __display_stack(table, data, settings, kill_progress, key, row_pointer, drill_down, None)
 
     if settings.mission_count:
-        __display_mission_count(frame, data, full_width, row_pointer)
+        __display_mission_count(table, data, full_width, row_pointer)
         row_pointer += 1
 
-    for warning in data.warnings:
-        __display_warning(frame, warning, full_width, row_pointer)
-        row_pointer += 1
+    if len(stacks) <= 1:
+        for warning in data.warnings:
+            __display_warning(table, warning, full_width, row_pointer)
+            row_pointer += 1
 
     return row_pointer
 
 
-def __display_mission_count(frame: tk.Frame, data: MassacreMissionData, width: int, row: int):
-    label = tk.Label(frame, text=f"{_('Mission Count')}: {data.mission_count}/20")
-    #label.config(fg="white")#白色在默认白色外观下看不清,换成蓝色或淡蓝或者用edmc的主题色
-    label.grid(column=0, columnspan=width, row=row, sticky=tk.W)
+def __display_mission_count(table: TableRenderer, data: MassacreMissionData, width: int, row: int):
+    #fg="white"白色在默认白色外观下看不清,换成蓝色或淡蓝或者用edmc的主题色
+    table.cell(row, 0, f"{_('Mission Count')}: {data.mission_count}/{MAX_ACTIVE_MISSIONS}", columnspan=width)
 
-def _display_outdated_version(frame: tk.Frame, settings: GridUiSettings, row: int) -> int:
+def _display_outdated_version(frame: tk.Frame, sub_frame: Optional[tk.Frame], settings: GridUiSettings,
+                              row: int) -> tk.Frame:
+    """
+    Show the Notice that a new Version is available below the Table. It is only created once.
+    """
+    if sub_frame is not None:
+        sub_frame.grid(row=row, column=0, columnspan=__get_row_width(settings))
+        return sub_frame
     sub_frame = tk.Frame(frame)
     sub_frame.grid(row=row, column=0, columnspan=__get_row_width(settings))
     sub_frame.config(pady=10)
@@ -348,24 +508,39 @@ def _display_outdated_version(frame: tk.Frame, settings: GridUiSettings, row: in
     for i, item in enumerate([btn_github, btn_dismiss]):
         item.grid(row=1, column=i)
     theme.update(sub_frame)
-    return row+1
+    return sub_frame
 
 
-def _display_waiting_for_missions(frame: tk.Frame):
-    tk.Label(frame, text=_("Massacre Plugin is ready.")).grid()
+def _display_building_index_info(table: TableRenderer):
+    """
+    Displayed while the Mission Index is built in the background.
+    """
+    table.cell(0, 0, _("Building Mission Index…"), sticky="")
+    return 1
+
+
+def _display_waiting_for_missions(table: TableRenderer):
+    table.cell(0, 0, _("Massacre Plugin is ready."), sticky="")
     return 1
 
 
 class UI:
     def __init__(self):
         self.__frame: Optional[tk.Frame] = None
+        self.__table: Optional[TableRenderer] = None
+        self.__outdated_version_frame: Optional[tk.Frame] = None
         self.__data: Optional[MassacreMissionData] = None
+        self.__stacks: list[tuple[StackKey, MassacreMissionData]] = []
+        self.__kill_progress: Mapping[tuple[StackKey, str], int] = {}
+        self.__drill_down = _DrillDown(self.update_ui)
         self.__settings: GridUiSettings = GridUiSettings(massacre.massacre_settings.configuration)
         massacre.massacre_settings.configuration.config_changed_listeners.append(self.rebuild_settings)
         self.__display_outdated_version = False
 
     def rebuild_settings(self, config: Configuration):
         self.__settings = GridUiSettings(config)
+        if self.__frame is not None:
+            scheduler.set_dispatcher(build_tk_dispatcher(self.__frame, config.update_delay_ms))
         self.update_ui()
 
     def set_frame(self, frame: tk.Frame):
@@ -380,12 +555,30 @@ class UI:
         self.__frame = tk.Frame(frame)
         #self.__frame.config(bg="red")
         self.__frame.grid(column=0, columnspan=cspan, sticky=tk.W)
+        self.__table = TableRenderer(self.__frame)
+        self.__outdated_version_frame = None
         self.__frame.bind("<<Refresh>>", lambda _: self.update_ui())
+        self.__frame.bind("<<MassacreIndexReady>>", lambda _: self.__apply_mission_index())
+        mission_expiry.set_timer(*mission_expiry.build_tk_timer(self.__frame))
+        # From now on Journal Events only schedule an update, which is run once Tk is idle
+        scheduler.set_dispatcher(
+            build_tk_dispatcher(self.__frame, massacre.massacre_settings.configuration.update_delay_ms))
+        # The Mission Index might have been built before the Frame existed
+        massacre.mission_repository.apply_pending_mission_data()
         self.update_ui()
 
-    def notify_about_new_massacre_mission_state(self, data: Optional[MassacreMissionData]):
+    def notify_about_new_massacre_mission_state(self, data: Optional[MassacreMissionData],
+                                                stacks: Optional[list[tuple[StackKey, MassacreMissionData]]] = None,
+                                                missions: Optional[Mapping[int, MassacreMission]] = None):
         self.__data = data
-        self.update_ui()
+        self.__stacks = stacks if stacks is not None else []
+        self.__drill_down.set_missions(missions if missions is not None else {})
+        # New Mission State and Kill Progress published by the same flush are drawn once
+        scheduler.schedule("ui", self.update_ui)
+
+    def notify_about_kill_progress(self, progress: Mapping[tuple[StackKey, str], int]):
+        self.__kill_progress = progress
+        scheduler.schedule("ui", self.update_ui)
 
     def notify_about_settings_changed(self):
         self.__settings: GridUiSettings = GridUiSettings(massacre.massacre_settings.configuration)
@@ -401,35 +594,57 @@ class UI:
             self.frame.grid_columnconfigure(col, minsize=max_width + 0)
 
     def update_ui(self):
-        if self.__frame is None:
+        if self.__frame is None or self.__table is None:
             logger.warning("Frame was not yet set. UI was not updated.")
             return
 
         logger.info("Updating UI...")
-        # Remove all the Children in the Frame for rebuild
-        for child in self.__frame.winfo_children():
-            child.destroy()
-
+        start = time.perf_counter()
+        # Labels are kept between updates. Only the ones that changed are touched, see TableRenderer.
+        table = self.__table
+        table.begin()
         row_pointer = 0
-        if self.__data is None:
-            row_pointer = _display_no_data_info(self.__frame)
+        if self.__data is None and massacre.mission_repository.is_building_mission_index():
+            row_pointer = _display_building_index_info(table)
+        elif self.__data is None:
+            row_pointer = _display_no_data_info(table)
         elif self.__data.target_sum == 0:
-            row_pointer = _display_waiting_for_missions(self.__frame)
+            row_pointer = _display_waiting_for_missions(table)
         else:
-            row_pointer = _display_data(self.__frame, self.__data, self.__settings)
+            row_pointer = _display_data(table, self.__data, self.__stacks, self.__settings,
+                                        self.__kill_progress, self.__drill_down)
             #self.adjust_column_widths()
+        table.end()
 
         if self.__display_outdated_version:
-            row_pointer = _display_outdated_version(self.__frame, self.__settings, row_pointer)
-
-        theme.update(self.__frame)
+            self.__outdated_version_frame = _display_outdated_version(self.__frame, self.__outdated_version_frame,
+                                                                      self.__settings, row_pointer)
+        elif self.__outdated_version_frame is not None:
+            self.__outdated_version_frame.destroy()
+            self.__outdated_version_frame = None
+
+        if table.created > 0:
+            theme.update(self.__frame)
         logger.info("UI Update done")
+        logger.debug(f"UI Update took {(time.perf_counter() - start) * 1000:.1f} ms, "
+                     f"{table.changed} Labels changed, {table.created} created")
 
     # To be called from thread
     def notify_version_outdated(self):
         self.__display_outdated_version = True
         self.__frame.event_generate("<<Refresh>>") # type: ignore
 
+    # To be called from thread
+    def notify_mission_index_ready(self):
+        if self.__frame is None:
+            # set_frame will pick up the Mission Index
+            return
+        self.__frame.event_generate("<<MassacreIndexReady>>")
+
+    def __apply_mission_index(self):
+        massacre.mission_repository.apply_pending_mission_data()
+        self.update_ui()
+
     # To be called from Button
     def notify_version_outdated_dismissed(self):
         self.__display_outdated_version = False
@@ -439,9 +654,11 @@ class UI:
 ui = UI()
 
 
-def handle_new_massacre_mission_state(data: dict[int, MassacreMission]):
-    data_view = MassacreMissionData(data)
-    ui.notify_about_new_massacre_mission_state(data_view)
+def handle_new_massacre_mission_state(snapshot: MassacreMissionSnapshot):
+    # The Totals are kept incrementally, see tests/test_massacre_mission_totals.py
+    data_view = MassacreMissionData.from_summary(snapshot.summary)
+    ui.notify_about_new_massacre_mission_state(data_view, build_stack_data(snapshot.stacks), snapshot.missions)
 
 
-massacre_mission_listeners.append(handle_new_massacre_mission_state)
+massacre_snapshot_listeners.append(handle_new_massacre_mission_state)
+kill_progress_listeners.append(ui.notify_about_kill_progress)
@@ -0,0 +1,134 @@
+"""
+This Module coalesces updates caused by Journal Events.
+
+When EDMC catches up on a Journal (e.g. after starting late) dozens of Mission Events arrive within milliseconds.
+Instead of recomputing and redrawing after every single one, each Event only schedules an update. Scheduled updates
+are run once the Tk main loop is idle, or once the configured frame budget has passed. An update scheduled more
+than once before that runs only once.
+"""
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from massacre.logger_factory import logger
+
+
+@dataclass
+class SchedulerMetrics:
+    """
+    Counts how many scheduled updates were merged since the Scheduler was created
+    """
+    scheduled: int = 0
+    """How often an update was scheduled"""
+    run: int = 0
+    """How many updates actually ran"""
+    flushes: int = 0
+    largest_flush: int = 0
+    """Most updates scheduled between two flushes"""
+    flush_time: float = 0.0
+    """Seconds spent running updates"""
+
+    @property
+    def merged(self) -> int:
+        """Updates that did not run, because the same update was already scheduled"""
+        return self.scheduled - self.run
+
+
+class UpdateScheduler:
+    """
+    Runs scheduled updates once per flush. Updates are identified by a key, so scheduling the same key again before
+    the flush replaces the earlier update.
+
+    The flush is arranged by the Dispatcher, see set_dispatcher. Without one, updates are run right away.
+    Updates scheduled by other updates (e.g. redrawing the UI once new Mission State was published) are run at the
+    end of the same flush, so they run once per flush as well.
+    """
+
+    def __init__(self):
+        self._pending: dict[str, Callable[[], None]] = {}
+        self._scheduled_since_flush = 0
+        self._is_flush_dispatched = False
+        self._is_flushing = False
+        self._dispatch: Optional[Callable[[Callable[[], None]], None]] = None
+        self.metrics = SchedulerMetrics()
+
+    def set_dispatcher(self, dispatch: Optional[Callable[[Callable[[], None]], None]]):
+        """
+        Set the Function that arranges for flush to be called later, e.g. Tk's after_idle (see build_tk_dispatcher).
+        It is called once for the first update scheduled after a flush. If the flush is driven otherwise (e.g. by
+        the Journal Tailer after every read), pass a Function that does nothing.
+
+        Pass None to run updates right away. Anything pending is run now.
+        """
+        self._dispatch = dispatch
+        self._is_flush_dispatched = False
+        if dispatch is None:
+            self.flush()
+        elif len(self._pending) > 0:
+            self._is_flush_dispatched = True
+            dispatch(self.flush)
+
+    def schedule(self, key: str, update: Callable[[], None]):
+        self._pending[key] = update
+        self._scheduled_since_flush += 1
+        self.metrics.scheduled += 1
+        if self._is_flushing:
+            # Run by the current flush
+            return
+        if self._dispatch is None:
+            self.flush()
+        elif not self._is_flush_dispatched:
+            self._is_flush_dispatched = True
+            self._dispatch(self.flush)
+
+    def flush(self):
+        """
+        Run all pending updates. Does nothing if there are none.
+        """
+        self._is_flush_dispatched = False
+        if len(self._pending) == 0 or self._is_flushing:
+            return
+
+        run = 0
+        start = time.perf_counter()
+        self._is_flushing = True
+        try:
+            while len(self._pending) > 0:
+                pending = self._pending
+                self._pending = {}
+                for key, update in pending.items():
+                    try:
+                        update()
+                    except Exception:
+                        logger.exception(f"Update {key} failed")
+                run += len(pending)
+        finally:
+            self._is_flushing = False
+        duration = time.perf_counter() - start
+        scheduled = self._scheduled_since_flush
+        self._scheduled_since_flush = 0
+
+        metrics = self.metrics
+        metrics.run += run
+        metrics.flushes += 1
+        metrics.largest_flush = max(metrics.largest_flush, scheduled)
+        metrics.flush_time += duration
+        if scheduled > run:
+            logger.debug(f"Merged {scheduled} scheduled updates into {run} ({duration * 1000:.1f} ms). "
+                         f"{metrics.merged} of {metrics.scheduled} updates merged so far.")
+
+
+def build_tk_dispatcher(widget, frame_budget_ms: int) -> Callable[[Callable[[], None]], None]:
+    """
+    Build a Dispatcher for a Tk Widget. With a frame budget of 0 the flush runs once Tk is idle, otherwise
+    after the frame budget has passed.
+    """
+    if frame_budget_ms <= 0:
+        return widget.after_idle
+    return lambda flush: widget.after(frame_budget_ms, flush)
+
+
+scheduler = UpdateScheduler()
+"""
+The Scheduler used for all updates caused by Journal Events.
+"""
@@ -0,0 +1,33 @@
+"""
+The Plugin imports EDMC's Modules (config, l10n, ...), so EDMC's source folder has to be on the PYTHONPATH:
+
+    PYTHONPATH=path/to/EDMarketConnector python -m pytest tests
+
+Tests that need them are skipped otherwise.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def repository(request):
+    """
+    A fresh Mission Repository for the CMDR of the Test Module (its CMDR constant), with no active Missions.
+    The global Repository is reset again after the Test.
+    """
+    pytest.importorskip("config")
+    from massacre import mission_repository
+
+    cmdr = request.module.CMDR
+    mission_repository._active_cmdr = None
+    mission_repository._active_uuids.clear()
+    mission_repository.set_new_repo({cmdr: {}})
+    mission_repository.set_active_uuids([], cmdr)
+    yield mission_repository.mission_repository
+    mission_repository.mission_repository = None
+    mission_repository._active_cmdr = None
+    mission_repository._active_uuids.clear()
@@ -0,0 +1,27 @@
+import json
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("config")
+
+from massacre import json_decoder  # noqa: E402
+
+_JOURNAL_LINES = (Path(__file__).parent / "fixtures" / "journal_lines.log").read_bytes().splitlines(keepends=True)
+"""Journal Lines with large Integers, Unicode (also escaped), Float Exponents and nested Objects"""
+
+
+@pytest.mark.parametrize("name, decode", json_decoder.available_backends())
+@pytest.mark.parametrize("line", _JOURNAL_LINES)
+def test_backend_decodes_like_json(name, decode, line):
+    decoded = decode(line)
+
+    assert decoded == json.loads(line)
+    # 1 == 1.0, so the types are compared as well
+    assert json.dumps(decoded) == json.dumps(json.loads(line))
+
+
+def test_loads_accepts_str():
+    line = _JOURNAL_LINES[0].decode("utf8")
+
+    assert json_decoder.loads(line) == json.loads(line)
@@ -0,0 +1,86 @@
+from typing import Optional
+
+import pytest
+
+pytest.importorskip("config")
+
+from massacre import journal_events, kill_progress  # noqa: E402
+from massacre.massacre_mission_aggregate import StackKey  # noqa: E402
+
+CMDR = "Killer"
+PIRATE = "$MissionUtil_FactionTag_Pirate;"
+
+
+@pytest.fixture(autouse=True)
+def unknown_location(repository):
+    __handle({"event": "LoadGame"})
+
+
+def __handle(entry: dict, system: Optional[str] = None):
+    journal_events.handle_journal_event(CMDR, entry, system)
+
+
+def __accept(uuid: int, source_faction: str, kill_count: int = 2, system: str = "Sol",
+             target_type: str = PIRATE):
+    __handle({"event": "MissionAccepted", "MissionID": uuid, "Name": "Mission_Massacre", "Faction": source_faction,
+              "TargetFaction": "Pirates Inc", "TargetType": target_type, "DestinationSystem": system,
+              "KillCount": kill_count, "Reward": 1_000_000, "Wing": False})
+
+
+def __bounty(target: str = "empire_eagle"):
+    __handle({"event": "Bounty", "Target": target, "VictimFaction": "Pirates Inc", "TotalReward": 10_000})
+
+
+def test_kill_is_credited_to_the_oldest_mission_of_every_faction():
+    __accept(1, "Nobles of Sol")
+    __accept(2, "Nobles of Sol")
+    __accept(3, "Sol Workers")
+
+    for _ in range(3):
+        __bounty()
+
+    assert [kill_progress.get_kills_done(x) for x in (1, 2, 3)] == [2, 1, 2]
+    sol = StackKey("Sol", "Pirates Inc", PIRATE)
+    assert kill_progress.get_kill_progress() == {(sol, "Nobles of Sol"): 3, (sol, "Sol Workers"): 2}
+
+
+def test_only_ship_kills_in_the_target_system_count():
+    __accept(1, "Nobles of Sol", system="Sol")
+    __accept(2, "Nobles of Sol", system="Alpha Centauri")
+    __accept(3, "Sol Workers", target_type="$MissionUtil_FactionTag_Civilian;")
+    __handle({"event": "FSDJump", "StarSystem": "Alpha Centauri"})
+
+    __bounty()
+    # Neither Skimmers nor Enemies on foot are Ships
+    __bounty("skimmerdrone")
+    __handle({"event": "Disembark", "OnPlanet": True})
+    __bounty("assaultsuitai_class1")
+    __bounty()
+    __handle({"event": "Embark", "SRV": False})
+    __handle({"event": "Location", "StarSystem": "Sol"})
+    __bounty()
+
+    assert [kill_progress.get_kills_done(x) for x in (1, 2, 3)] == [1, 1, 0]
+
+
+def test_progress_is_kept_per_stack():
+    __accept(1, "Nobles of Sol", system="Sol")
+    __accept(2, "Nobles of Sol", system="Beta")
+    __handle({"event": "FSDJump", "StarSystem": "Beta"})
+
+    __bounty()
+
+    assert kill_progress.get_kill_progress() == {(StackKey("Sol", "Pirates Inc", PIRATE), "Nobles of Sol"): 0,
+                                                 (StackKey("Beta", "Pirates Inc", PIRATE), "Nobles of Sol"): 1}
+
+
+def test_system_known_to_edmc_is_used_until_the_first_location():
+    __accept(1, "Nobles of Sol", system="Sol")
+    __accept(2, "Nobles of Sol", system="Beta")
+
+    # The Plugin was started mid-session, so only EDMC knows the System
+    __handle({"event": "Bounty", "Target": "empire_eagle", "VictimFaction": "Pirates Inc"}, "Beta")
+    __handle({"event": "FSDJump", "StarSystem": "Sol"}, "Beta")
+    __handle({"event": "Bounty", "Target": "empire_eagle", "VictimFaction": "Pirates Inc"}, "Beta")
+
+    assert [kill_progress.get_kills_done(x) for x in (1, 2)] == [1, 1]
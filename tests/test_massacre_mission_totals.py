@@ -0,0 +1,58 @@
+"""
+The Totals shown in the UI are kept incrementally by the Massacre Mission State. After every Event they have to be
+the same as computing them from all active Missions again.
+"""
+import random
+
+import pytest
+
+pytest.importorskip("config")
+pytest.importorskip("theme")
+
+from massacre import kill_progress  # noqa: E402
+from massacre.massacre_mission_state import get_snapshot  # noqa: E402
+from massacre.ui import MassacreMissionData  # noqa: E402
+
+CMDR = "Totals"
+_FACTIONS = ["Nobles of Sol", "Sol Workers", "Sol Party", "Pirates of Sol"]
+_TARGET_FACTIONS = ["Pirates Inc", "Raiders"]
+
+pytestmark = pytest.mark.usefixtures("repository")
+
+
+def _accepted_event(rng: random.Random, uuid: int) -> dict:
+    return {
+        "event": "MissionAccepted", "MissionID": uuid, "Name": rng.choice(["Mission_Massacre", "Mission_MassacreWing"]),
+        "Faction": rng.choice(_FACTIONS), "TargetFaction": rng.choice(_TARGET_FACTIONS),
+        "TargetType": rng.choice(["$MissionUtil_FactionTag_Pirate;", "$MissionUtil_FactionTag_Civilian;"]),
+        "DestinationSystem": rng.choice(["Sol", "Alpha Centauri"]), "KillCount": rng.randint(1, 60),
+        "Reward": rng.randint(1, 80) * 100_000, "Wing": rng.random() < 0.5, "Expiry": "2099-01-01T00:00:00Z"
+    }
+
+
+def _assert_totals_match_recompute():
+    snapshot = get_snapshot()
+    incremental = MassacreMissionData.from_summary(snapshot.summary)
+
+    assert incremental.differences(MassacreMissionData(snapshot.missions)) == []
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_incremental_totals_match_full_recompute(repository, seed):
+    rng = random.Random(seed)
+    next_uuid = 1
+    for _ in range(80):
+        active = sorted(get_snapshot().missions)
+        action = rng.choice(["accept", "accept", "kill", "redirect", "complete", "expire"])
+        if action == "accept" or len(active) == 0:
+            repository.notify_about_new_mission_accepted(_accepted_event(rng, next_uuid), CMDR)
+            next_uuid += 1
+        elif action == "kill":
+            kill_progress.notify_about_kill(rng.choice(_TARGET_FACTIONS))
+        elif action == "redirect":
+            repository.notify_complete_mission_gone(rng.choice(active))
+        elif action == "complete":
+            repository.notify_about_mission_gone(rng.choice(active))
+        else:
+            repository.notify_about_missions_expired(rng.sample(active, rng.randint(1, min(3, len(active)))))
+        _assert_totals_match_recompute()
@@ -0,0 +1,102 @@
+import pytest
+
+pytest.importorskip("config")
+
+from massacre import mission_repository  # noqa: E402
+from massacre.mission_record import MissionRecord  # noqa: E402
+
+CMDR = "Jameson"
+
+
+def _accepted_event(uuid: int) -> dict:
+    return {"event": "MissionAccepted", "MissionID": uuid, "Name": "Mission_Massacre", "TargetType": "Pirates",
+            "Faction": "Faction A", "KillCount": 10, "Reward": 1_000_000}
+
+
+def _records(*uuids: int) -> dict[int, MissionRecord]:
+    return {uuid: MissionRecord.from_event(_accepted_event(uuid)) for uuid in uuids}
+
+
+@pytest.fixture(autouse=True)
+def repository(repository):
+    """The Missions 1 and 2 are known. Yields the Mission UUIDs requested as unknown."""
+    mission_repository.set_new_repo({CMDR: _records(1, 2)})
+    requested: list[list[int]] = []
+    listener = lambda uuids, _cmdr: requested.append(uuids)  # noqa: E731
+    mission_repository.unknown_missions_event_listeners.append(listener)
+    yield requested
+    mission_repository.unknown_missions_event_listeners.remove(listener)
+
+
+def test_unknown_missions_are_requested(repository):
+    mission_repository.set_active_uuids([1, 2, 3], CMDR)
+
+    assert repository == [[3]]
+    assert sorted(mission_repository.mission_repository.active_missions) == [1, 2]
+
+
+def test_resolved_missions_become_active(repository):
+    mission_repository.set_active_uuids([1, 2, 3], CMDR)
+    mission_repository.set_pending_mission_data({CMDR: _records(3)})
+    mission_repository.apply_pending_mission_data()
+
+    assert sorted(mission_repository.mission_repository.active_missions) == [1, 2, 3]
+
+
+def test_missions_accepted_and_gone_before_resolution_are_kept(repository):
+    mission_repository.set_active_uuids([1, 2, 3, 4], CMDR)
+    repo = mission_repository.mission_repository
+    repo.notify_about_new_mission_accepted(_accepted_event(5), CMDR)
+    repo.notify_about_mission_gone(1)
+    # Completed before it was resolved
+    repo.notify_about_mission_gone(4)
+
+    mission_repository.set_pending_mission_data({CMDR: _records(3, 4)})
+    mission_repository.apply_pending_mission_data()
+
+    assert sorted(repo.active_missions) == [2, 3, 5]
+
+
+def test_expired_missions_stay_gone_after_resolution(repository):
+    mission_repository.set_active_uuids([1, 2, 3], CMDR)
+    repo = mission_repository.mission_repository
+    repo.notify_about_missions_expired([2])
+
+    mission_repository.set_pending_mission_data({CMDR: _records(3)})
+    mission_repository.apply_pending_mission_data()
+
+    assert sorted(repo.active_missions) == [1, 3]
+
+
+def test_events_before_the_mission_data_are_replayed(repository):
+    mission_repository.mission_repository = mission_repository.MissionRepository()
+    mission_repository.set_active_uuids([1, 2], CMDR)
+    repo = mission_repository.mission_repository
+    repo.notify_about_new_mission_accepted(_accepted_event(5), CMDR)
+    repo.notify_about_mission_gone(1)
+
+    repo.notify_about_mission_data({CMDR: _records(1, 2)})
+
+    assert sorted(repo.active_missions) == [2, 5]
+
+
+def test_cmdr_is_rehydrated_from_synced_active_uuids(repository):
+    other_cmdr = "Other"
+    loaded: list[str] = []
+
+    def load(cmdr: str) -> dict[int, MissionRecord]:
+        loaded.append(cmdr)
+        return _records(10, 11, 12) if cmdr == other_cmdr else {}
+
+    mission_repository.set_active_uuids([10, 11, 12], other_cmdr)
+    mission_repository.mission_repository.notify_about_mission_gone(11)
+    # A new Repository (e.g. after the Mission Index was rebuilt) for another CMDR
+    mission_repository.set_new_repo({CMDR: _records(1, 2)})
+    mission_repository.set_active_uuids([1, 2], CMDR)
+    repo = mission_repository.mission_repository
+    repo.notify_about_mission_loader(load)
+
+    repo.notify_about_new_mission_accepted(_accepted_event(13), other_cmdr)
+
+    assert other_cmdr in loaded
+    assert sorted(repo.active_missions) == [10, 12, 13]
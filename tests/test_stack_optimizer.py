@@ -0,0 +1,67 @@
+"""
+The Stack Optimizer has to find the same Stack as trying every possible Choice of Missions.
+"""
+import itertools
+import random
+from typing import Optional
+
+import pytest
+
+pytest.importorskip("config")
+
+from massacre.massacre_mission_state import MassacreMission  # noqa: E402
+from massacre.stack_optimizer import Objective, StackPlan, find_best_stack  # noqa: E402
+
+_FACTIONS = ["Nobles of Sol", "Sol Workers", "Sol Party"]
+
+
+def _random_missions(rng: random.Random, amount: int, first_id: int, is_completed: bool = False) \
+        -> list[MassacreMission]:
+    return [
+        MassacreMission("Pirates Inc", rng.randint(1, 12), rng.randint(1, 20) * 100_000, "Sol", "Pirates",
+                        rng.choice(_FACTIONS), rng.random() < 0.5, is_completed, first_id + i)
+        for i in range(amount)
+    ]
+
+
+def _value(mission: MassacreMission, objective: Objective) -> int:
+    return mission.count if objective == Objective.RATIO else mission.reward
+
+
+def _score(missions: list[MassacreMission], objective: Objective) -> float:
+    """Value per required Kill of the Stack"""
+    kills_by_faction: dict[str, int] = {}
+    for mission in missions:
+        kills_by_faction[mission.source_faction] = kills_by_faction.get(mission.source_faction, 0) + mission.count
+    return sum(_value(x, objective) for x in missions) / max(kills_by_faction.values())
+
+
+def _brute_force(open_missions: list[MassacreMission], objective: Objective, slots: int) -> Optional[float]:
+    scores = [_score(list(missions), objective) for k in range(1, min(slots, len(open_missions)) + 1)
+              for missions in itertools.combinations(open_missions, k)]
+    return max(scores) if len(scores) > 0 else None
+
+
+def _plan_score(plan: StackPlan, objective: Objective) -> float:
+    return _score([x for x in plan.missions if not x.is_completed], objective)
+
+
+@pytest.mark.parametrize("objective", list(Objective))
+@pytest.mark.parametrize("seed", range(40))
+def test_best_stack_matches_brute_force(objective: Objective, seed: int):
+    rng = random.Random(seed)
+    current = _random_missions(rng, rng.randint(0, 4), 0) + _random_missions(rng, rng.randint(0, 2), 100, True)
+    candidates = _random_missions(rng, rng.randint(0, 6), 1000)
+    mission_cap = rng.randint(1, 6)
+
+    plan = find_best_stack(current, candidates, objective, mission_cap)
+
+    completed = [x for x in current if x.is_completed]
+    expected = _brute_force([x for x in current if not x.is_completed] + candidates, objective,
+                            mission_cap - len(completed))
+    if expected is None:
+        assert plan is None
+        return
+    assert plan is not None
+    assert len(plan.missions) <= mission_cap
+    assert _plan_score(plan, objective) == pytest.approx(expected)
@@ -0,0 +1,48 @@
+import pytest
+
+pytest.importorskip("config")
+pytest.importorskip("theme")
+
+from massacre import journal_events  # noqa: E402
+from massacre.update_scheduler import UpdateScheduler, scheduler  # noqa: E402
+import massacre.ui  # noqa: E402
+
+CMDR = "Scheduled"
+
+
+def test_updates_scheduled_by_updates_run_in_the_same_flush():
+    dispatched = []
+    runs = []
+    test_scheduler = UpdateScheduler()
+    test_scheduler.set_dispatcher(dispatched.append)
+
+    test_scheduler.schedule("state", lambda: test_scheduler.schedule("ui", lambda: runs.append("ui")))
+    test_scheduler.schedule("progress", lambda: test_scheduler.schedule("ui", lambda: runs.append("ui")))
+    for flush in list(dispatched):
+        flush()
+
+    assert len(dispatched) == 1
+    assert runs == ["ui"]
+
+
+def test_kills_and_redirect_redraw_the_ui_once(repository, monkeypatch):
+    journal_events.handle_journal_event(CMDR, {
+        "event": "MissionAccepted", "MissionID": 1, "Name": "Mission_Massacre", "Faction": "Nobles of Sol",
+        "TargetFaction": "Pirates Inc", "TargetType": "$MissionUtil_FactionTag_Pirate;", "DestinationSystem": "Sol",
+        "KillCount": 2, "Reward": 1_000_000, "Wing": False})
+    redraws = []
+    monkeypatch.setattr(massacre.ui.ui, "update_ui", lambda: redraws.append(1))
+    dispatched = []
+    scheduler.set_dispatcher(dispatched.append)
+    try:
+        for _ in range(2):
+            journal_events.handle_journal_event(CMDR, {"event": "Bounty", "Target": "empire_eagle",
+                                                       "VictimFaction": "Pirates Inc"})
+        journal_events.handle_journal_event(CMDR, {"event": "MissionRedirected", "MissionID": 1})
+        for flush in list(dispatched):
+            flush()
+    finally:
+        scheduler.set_dispatcher(None)
+
+    assert len(dispatched) == 1
+    assert len(redraws) == 1